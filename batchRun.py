@@ -0,0 +1,9 @@
+#!/usr/bin/env python
+
+# Runs several fileLists and histogram lists in one process, each KEGG map and count file is read once (geneExpression.cli.batchMain)
+	# fileLists of the same organisms (e.g. transcripts and proteins) are also compared in paired tables
+
+from geneExpression.cli import batchMain
+
+if __name__ == "__main__":
+	batchMain()
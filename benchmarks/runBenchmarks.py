@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+
+# Scaling benchmarks for the graphing and histogram scripts on synthetic data (see synthetic.py)
+	# Each pipeline stage (load, map, aggregate, render) is timed in process for both ways of placing genes in the shared KEGG model:
+		# index: networkGraphing.py, first listing of each locus
+		# traversal: networkGraphing_hardCode.py, every category and every listing of each locus
+	# The three entry points are also timed end to end in a subprocess
+	# Wall time, CPU time, throughput (genes/s) and peak memory are reported; results can be stored as a baseline,
+		# and later runs fail (exit status 1) when a stage is slower than its baseline by more than the threshold
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+benchmarkDir = os.path.dirname(os.path.abspath(__file__))
+repositoryDir = os.path.dirname(benchmarkDir)
+sys.path.insert(0, repositoryDir)
+sys.path.insert(0, benchmarkDir)
+
+from synthetic import writeDataset
+from geneExpression.keggIndex import loadHierarchy, firstHitLinks, allHitLinks
+from geneExpression.countFiles import loadCountFile
+from geneExpression.aggregation import rollupMatrix, rollupTotals, relativeTotals, combinedDict
+from geneExpression.pipeline import organismResult, mergeOrganisms, pathwayMatrix
+from geneExpression.rendering import chartJob, renderCharts
+from geneExpression.analysis import readFileList
+
+defaultBaseline = os.path.join(benchmarkDir, "baseline.json")
+
+# Runs function repeat times and keeps the fastest run
+	# Peak memory comes from one extra run under tracemalloc, so its overhead does not leak into the timings
+def measure(function, repeat):
+	best = None
+	for i in range(repeat):
+		wall = time.perf_counter()
+		cpu = time.process_time()
+		function()
+		record = {'wall': time.perf_counter() - wall, 'cpu': time.process_time() - cpu}
+		if best is None or record['wall'] < best['wall']:
+			best = record
+	tracemalloc.start()
+	result = function()
+	best['peakBytes'] = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return best, result
+
+# In-process stage timings for one traversal strategy, returns {stage: record}
+def stageBenchmarks(strategy, jsonFileList, countFileList, repeat, outputDir):
+	records = {}
+	records['load'], matrixList = measure(lambda: [loadCountFile(path, useCache=False) for path in countFileList], repeat)
+	loadRecord, hierarchyList = measure(lambda: [loadHierarchy(path, useCache=False) for path in jsonFileList], repeat)
+	for key in ('wall', 'cpu'):
+		records['load'][key] += loadRecord[key]
+	records['load']['peakBytes'] = max(records['load']['peakBytes'], loadRecord['peakBytes'])
+	linkFunction = firstHitLinks if strategy == "index" else allHitLinks
+	records['map'], linkList = measure(lambda: [linkFunction(hierarchyList[i], matrixList[i]['loci']) for i in range(len(matrixList))], repeat)
+	def aggregate():
+		resultList = [organismResult(matrixList[i], linkList[i]) for i in range(len(matrixList))]
+		networkTrackDict, subNetworkTrackDict, pathwayLabels = mergeOrganisms(resultList)
+		networkLabels = list(networkTrackDict)
+		subNetworkLabels = list(subNetworkTrackDict)
+		pathwayToSubNetwork = rollupMatrix(pathwayLabels, subNetworkLabels, subNetworkTrackDict)
+		subNetworkToNetwork = rollupMatrix(subNetworkLabels, networkLabels, networkTrackDict)
+		networkTotals = []
+		for result in resultList:
+			totals = rollupTotals(pathwayMatrix(result, pathwayLabels), pathwayToSubNetwork, subNetworkToNetwork)
+			networkTotals.append(relativeTotals(totals[0], totals[0].sum(axis=0)))
+		return networkLabels, networkTotals
+	records['aggregate'], (networkLabels, networkTotals) = measure(aggregate, repeat)
+	def render():
+		organismList = [os.path.basename(path)[0:3] for path in jsonFileList]
+		jobList = [chartJob(combinedDict(networkLabels, networkTotals, t), organismList, "Timepoint "+str(t + 1),
+							os.path.join(outputDir, strategy+"_Network"), t + 1) for t in range(networkTotals[0].shape[1])]
+		return renderCharts(jobList)
+	records['render'], rendered = measure(render, repeat)
+	return records
+
+# Runs an entry point in a subprocess and records its wall time and peak RSS
+def scriptBenchmark(arguments, workDir, repeat):
+	# The script is run through runpy so the child can report its own peak RSS on exit
+	wrapper = ("import atexit, resource, runpy, sys\n"
+			"atexit.register(lambda: sys.stderr.write('\\nBENCHMARK_MAXRSS %d\\n' % resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))\n"
+			"sys.argv = sys.argv[1:]\n"
+			"sys.path.insert(0, " + repr(repositoryDir) + ")\n"
+			"runpy.run_path(sys.argv[0], run_name='__main__')\n")
+	environment = dict(os.environ, MPLBACKEND="Agg")
+	best = None
+	for i in range(repeat):
+		wall = time.perf_counter()
+		process = subprocess.Popen([sys.executable, "-c", wrapper] + arguments, cwd=workDir, env=environment,
+								stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+		output, errors = process.communicate()
+		wall = time.perf_counter() - wall
+		if process.returncode != 0:
+			raise RuntimeError(" ".join(arguments)+" failed:\n"+errors)
+		maxRSS = [int(line.split()[1]) for line in errors.splitlines() if line.startswith("BENCHMARK_MAXRSS")]
+		# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+		peakBytes = maxRSS[-1] * (1 if sys.platform == "darwin" else 1024) if maxRSS else 0
+		if best is None or wall < best['wall']:
+			best = {'wall': wall, 'peakBytes': peakBytes}
+	return best
+
+def runBenchmarks(args, dataDir, outputDir):
+	fileList, histogramList = writeDataset(dataDir, args.organisms, args.genes, args.timepoints, args.networks, args.fanOut, args.multi, seed=args.seed)
+	jsonFileList, countFileList = readFileList(fileList)
+	totalGenes = args.genes * args.organisms
+	results = {}
+	for strategy in ("index", "traversal"):
+		for stage, record in sorted(stageBenchmarks(strategy, jsonFileList, countFileList, args.repeat, outputDir).items()):
+			results[strategy+"."+stage] = record
+	if not args.skipScripts:
+		scriptList = [("networkGraphing.py", ["-d", fileList, "--noCache"]),
+					("networkGraphing_hardCode.py", ["-d", fileList, "--noCache"]),
+					("histogram.py", ["-d", histogramList])]
+		for script, arguments in scriptList:
+			results["script."+script] = scriptBenchmark([os.path.join(repositoryDir, script)] + arguments, outputDir, args.repeat)
+	for name in results:
+		results[name]['genesPerSecond'] = totalGenes / results[name]['wall'] if results[name]['wall'] > 0 else 0.0
+	return results
+
+def printTable(results, baseline):
+	print("%-40s %10s %10s %14s %12s %10s" % ("stage", "wall (s)", "cpu (s)", "genes/s", "peak (MB)", "vs base"))
+	for name in sorted(results):
+		record = results[name]
+		ratio = ""
+		if name in baseline and baseline[name]['wall'] > 0:
+			ratio = "%.2fx" % (record['wall'] / baseline[name]['wall'])
+		cpu = "%.3f" % record['cpu'] if 'cpu' in record else "-"
+		print("%-40s %10.3f %10s %14.0f %12.1f %10s" % (name, record['wall'], cpu, record['genesPerSecond'], record['peakBytes'] / 1e6, ratio))
+
+# Stages whose wall time exceeds the baseline by more than threshold (a fraction, e.g. 0.25)
+	# Baselines are only comparable for the same data set, so mismatching configurations are reported instead
+def regressions(results, baselineReport, configuration, threshold):
+	if baselineReport.get('configuration') != configuration:
+		print("Baseline was recorded for a different configuration, not comparing")
+		return []
+	failed = []
+	for name in sorted(results):
+		if name in baselineReport['results']:
+			limit = baselineReport['results'][name]['wall'] * (1.0 + threshold)
+			if results[name]['wall'] > limit:
+				failed.append((name, results[name]['wall'], limit))
+	return failed
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--organisms", type=int, required=False, default=2)
+	parser.add_argument("--genes", type=int, required=False, default=4000)
+	parser.add_argument("--timepoints", type=int, required=False, default=5)
+	parser.add_argument("--networks", type=int, required=False, default=6)
+	parser.add_argument("--fanOut", type=int, required=False, default=4)
+	parser.add_argument("--multi", type=float, required=False, default=0.3)
+	parser.add_argument("--seed", type=int, required=False, default=0)
+	parser.add_argument("--repeat", type=int, required=False, default=3)
+	parser.add_argument("--skipScripts", action="store_true")
+	# Baseline file, --saveBaseline stores the current results in it and --threshold sets the allowed slowdown
+	parser.add_argument("--baseline", type=str, required=False, default=defaultBaseline)
+	parser.add_argument("--saveBaseline", action="store_true")
+	parser.add_argument("--threshold", type=float, required=False, default=0.25)
+	# Writes the full results as JSON
+	parser.add_argument("--output", "-o", type=str, required=False, default=None)
+	args = parser.parse_args()
+
+	configuration = {'organisms': args.organisms, 'genes': args.genes, 'timepoints': args.timepoints, 'networks': args.networks,
+					'fanOut': args.fanOut, 'multi': args.multi, 'seed': args.seed, 'skipScripts': args.skipScripts}
+	workDir = tempfile.mkdtemp(prefix="geneExpressionBenchmark")
+	try:
+		dataDir = os.path.join(workDir, "data")
+		outputDir = os.path.join(workDir, "output")
+		os.makedirs(dataDir)
+		os.makedirs(outputDir)
+		results = runBenchmarks(args, dataDir, outputDir)
+	finally:
+		shutil.rmtree(workDir)
+
+	baselineReport = {}
+	if os.path.exists(args.baseline):
+		with open(args.baseline) as f:
+			baselineReport = json.load(f)
+	printTable(results, baselineReport.get('results', {}) if baselineReport.get('configuration') == configuration else {})
+	report = {'configuration': configuration, 'python': sys.version.split()[0], 'results': results}
+	if args.output:
+		with open(args.output, "w") as f:
+			json.dump(report, f, indent=1, sort_keys=True)
+	if args.saveBaseline:
+		with open(args.baseline, "w") as f:
+			json.dump(report, f, indent=1, sort_keys=True)
+		print("Baseline written to "+args.baseline)
+	elif baselineReport:
+		failed = regressions(results, baselineReport, configuration, args.threshold)
+		for name, wall, limit in failed:
+			print("REGRESSION "+name+": %.3fs (limit %.3fs)" % (wall, limit))
+		if failed:
+			sys.exit(1)
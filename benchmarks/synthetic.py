@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+# Generates synthetic KEGG-style JSON maps and count matrices for benchmarking
+	# Every organism gets <org>/<org>00001.json, <org>/<org>.counts.txt (header + counts) and <org>/<org>.counts.nohead.txt,
+		# plus a fileList.txt and histogramList.txt for the whole set, all under the output directory
+
+import argparse
+import json
+import os
+import numpy as np
+
+# Three character organism IDs (a00, a01, ... b00, ...) as the scripts take the first three characters of the JSON file name
+def organismID(i):
+	return chr(97 + i // 100) + "%02d" % (i % 100)
+
+# Builds the map and the locus list of one organism
+	# networks x fanOut subNetworks x fanOut pathways, each gene listed under one pathway and, with probability multi, a second one
+	# unmapped genes are left out of the map but kept in the count matrix
+def syntheticMap(organism, genes, networks, fanOut, multi, unmapped, rng):
+	loci = [organism.upper()+"_%06d" % (i + 1) for i in range(genes)]
+	pathwayCount = networks * fanOut * fanOut
+	pathwayGenes = [[] for i in range(pathwayCount)]
+	for i in range(genes):
+		if rng.random_sample() < unmapped:
+			continue
+		first = rng.randint(pathwayCount)
+		pathwayGenes[first].append(i)
+		if rng.random_sample() < multi:
+			second = rng.randint(pathwayCount)
+			if second != first:
+				pathwayGenes[second].append(i)
+	networkList = []
+	for n in range(networks):
+		subNetworkList = []
+		for s in range(fanOut):
+			pathwayList = []
+			for p in range(fanOut):
+				pathway = (n * fanOut + s) * fanOut + p
+				node = {"name": "%05d Synthetic pathway %d [PATH:%s%05d]" % (pathway, pathway, organism, pathway)}
+				if pathwayGenes[pathway]:
+					node["children"] = [{"name": loci[i]+" gen%d; synthetic protein %d\tK%05d gen%d; synthetic enzyme [EC:1.1.1.%d]" % (i, i, i % 99999, i, i % 300)}
+										for i in sorted(pathwayGenes[pathway])]
+				pathwayList.append(node)
+			subNetworkList.append({"name": "09%d%02d Synthetic subnetwork %d" % (n % 10, s, n * fanOut + s), "children": pathwayList})
+		networkList.append({"name": "09%d00 Synthetic network %d" % (n % 10, n), "children": subNetworkList})
+	# A Brite category, which both scripts drop
+	networkList.append({"name": "09180 Brite Hierarchies", "children": [{"name": "09181 Protein families: metabolism",
+						"children": [{"name": "01000 Enzymes [BR:%s01000]" % organism, "children": [{"name": loci[0]+" gen0; synthetic protein 0"}]}]}]})
+	return {"name": organism+"00001", "children": networkList}, loci
+
+def writeOrganism(directory, organism, genes, timepoints, networks, fanOut, multi, unmapped, rng):
+	tree, loci = syntheticMap(organism, genes, networks, fanOut, multi, unmapped, rng)
+	organismDir = os.path.join(directory, organism)
+	if not os.path.isdir(organismDir):
+		os.makedirs(organismDir)
+	jsonFile = os.path.join(organismDir, organism+"00001.json")
+	with open(jsonFile, "w") as f:
+		json.dump(tree, f, indent=1)
+	# Overdispersed counts with a share of silent genes
+	counts = rng.gamma(0.5, 200.0, size=(genes, timepoints)) * (rng.random_sample((genes, timepoints)) > 0.1)
+	countFile = os.path.join(organismDir, organism+".counts.txt")
+	with open(countFile, "w") as f:
+		f.write("locus\t"+"\t".join("T"+str(t + 1) for t in range(timepoints))+"\n")
+		for i in range(genes):
+			f.write(loci[i]+"\t"+"\t".join(repr(float(x)) for x in counts[i])+"\n")
+	# histogram.py reads five sample columns without a header
+	noheadFile = os.path.join(organismDir, organism+".counts.nohead.txt")
+	fiveColumns = np.zeros((genes, 5))
+	fiveColumns[:, :min(5, timepoints)] = counts[:, :5]
+	with open(noheadFile, "w") as f:
+		for i in range(genes):
+			f.write(loci[i]+"\t"+"\t".join(repr(float(x)) for x in fiveColumns[i])+"\n")
+	return jsonFile, countFile, noheadFile
+
+# Writes a complete synthetic data set and returns the paths of its fileList.txt and histogramList.txt
+def writeDataset(directory, organisms=2, genes=4000, timepoints=5, networks=6, fanOut=4, multi=0.3, unmapped=0.1, seed=0):
+	rng = np.random.RandomState(seed)
+	fileList = os.path.join(directory, "fileList.txt")
+	histogramList = os.path.join(directory, "histogramList.txt")
+	with open(fileList, "w") as f, open(histogramList, "w") as h:
+		for i in range(organisms):
+			jsonFile, countFile, noheadFile = writeOrganism(directory, organismID(i), genes, timepoints, networks, fanOut, multi, unmapped, rng)
+			f.write(jsonFile+"\t"+countFile+"\n")
+			h.write(noheadFile+"\n")
+	return fileList, histogramList
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--output", "-o", type=str, required=True)
+	parser.add_argument("--organisms", type=int, required=False, default=2)
+	parser.add_argument("--genes", type=int, required=False, default=4000)
+	parser.add_argument("--timepoints", type=int, required=False, default=5)
+	parser.add_argument("--networks", type=int, required=False, default=6)
+	parser.add_argument("--fanOut", type=int, required=False, default=4)
+	parser.add_argument("--multi", type=float, required=False, default=0.3)
+	parser.add_argument("--seed", type=int, required=False, default=0)
+	args = parser.parse_args()
+	if not os.path.isdir(args.output):
+		os.makedirs(args.output)
+	print(writeDataset(args.output, args.organisms, args.genes, args.timepoints, args.networks, args.fanOut, args.multi, seed=args.seed)[0])
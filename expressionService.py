@@ -0,0 +1,9 @@
+#!/usr/bin/env python
+
+# Keeps the KEGG maps and count matrices of a fileList in memory and answers distribution queries over HTTP or a Unix socket
+	# (geneExpression.cli.serviceMain), organisms are reloaded when their files change
+
+from geneExpression.cli import serviceMain
+
+if __name__ == "__main__":
+	serviceMain()
@@ -0,0 +1,21 @@
+# Loading, mapping, aggregation and plotting of gene/protein expression over KEGG pathway maps, callable in process
+	# matplotlib and pandas are only imported once a chart or histogram is drawn
+
+from .analysis import (levelNames, readFileList, organismName, clearCaches, cleanDict, relativeDistribution,
+						traversalDistribution, relativeFromResults, traversalFromResults, treeDistribution, depthName, koDistribution,
+						combinedArrays, combinedDicts, timepointLabels, joinedTimepoint)
+from .keggIndex import (LabelTable, loadKeggMap, loadHierarchy, compactHierarchy, firstHitLinks, allHitLinks, treeLinks, locusKOs,
+						labelClean, attributionPolicies, attributionWeights)
+from .countFiles import loadCountFile, countFileChunks, clearCountCache
+from .countStore import CountStore, loadCountStore, rowOrganisms
+from .aggregation import (metricNames, geneBase, finishMetrics, membershipMatrix, sparseTotals, rollupMatrix, rollupTotals, subtreeTotals, depthTotals,
+							relativeTotals, combinedDict, levelRankings, prunedLevel)
+from .pipeline import OrganismAccumulator, indexedOrganism, traversedOrganism, treeOrganism, koOrganism, runOrganisms, mergeOrganisms, pathwayMatrix
+from .export import distributionRows, writeTable, exportDistribution
+from .statistics import placedGenes, significanceTests, adjustedPValues
+from .service import ExpressionService, makeServer, socketPathFree
+from .batch import readManifest, SharedInputs, pairedRows, runBatch
+from .rendering import chartJob, levelChartJob, renderChart, renderCharts, smallMultiplesJobs
+from .histogram import (readHistogramList, readCounts, filterQuantiles, plotHistogram, readCountArray, iterCountChunks,
+						QuantileSketch, vectorizedHistogram, streamingHistogram, plotBinnedHistogram)
+from .profiling import Profiler, makeProfiler
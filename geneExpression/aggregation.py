@@ -0,0 +1,143 @@
+# Vectorised aggregation of count matrices over the KEGG hierarchy
+	# Genes -> Pathways -> SubNetworks -> Networks are expressed as a gene x pathway membership matrix
+	# and pathway -> subNetwork -> network rollup matrices, so every level of every timepoint is a few matrix products
+
+import numpy as np
+
+# Builds a genes x pathways matrix with a 1.0 (or weights[i]) for every (geneRows[i], pathwayColumns[i]) link
+def membershipMatrix(geneCount, pathwayCount, geneRows, pathwayColumns, weights=None):
+	membership = np.zeros((geneCount, pathwayCount))
+	membership[geneRows, pathwayColumns] = 1.0 if weights is None else weights
+	return membership
+
+# Pathways x columns totals of genes x columns values through a sparse genes x pathways weight matrix,
+	# held as (geneRows[i], pathwayRows[i], weights[i]) triplets (keggIndex.attributionWeights)
+	# The weighted rows are sorted by pathway and added up with one segmented reduction, whatever the number of links per gene
+def sparseTotals(values, geneRows, pathwayRows, weights, pathwayCount):
+	totals = np.zeros((pathwayCount, values.shape[1]))
+	if not len(geneRows):
+		return totals
+	order = np.argsort(pathwayRows, kind='stable')
+	sortedRows = pathwayRows[order]
+	starts = np.flatnonzero(np.concatenate([[True], sortedRows[1:] != sortedRows[:-1]]))
+	totals[sortedRows[starts]] = np.add.reduceat(values[geneRows[order]] * weights[order][:, None], starts, axis=0)
+	return totals
+
+# Metrics computed for every gene, in the order they are stacked
+	# raw: read counts
+	# proportional: 1/genes for every expressed gene, so level totals are the share of the organism's genes expressed there
+	# tpm: transcripts per million, reads per kilobase of id_len scaled to a million per timepoint
+	# rpkm: reads per kilobase of id_len per million reads of the timepoint
+metricNames = ['raw', 'proportional', 'tpm', 'rpkm']
+lengthMetrics = ['tpm', 'rpkm']
+
+# Additive per-gene quantities every metric derives from, side by side in one genes x (quantities * timepoints) block:
+	# read counts, expressed genes (1.0 or 0.0) and, when gene lengths are known, reads per kilobase of id_len
+		# (genes without a length count as 0.0 there)
+	# Being additive, they can be summed per pathway over any split of the genes and normalized once at the end (finishMetrics)
+def geneBase(counts, lengths=None):
+	counts = np.asarray(counts, dtype=np.float64)
+	blocks = [counts, (counts > 0.0).astype(np.float64)]
+	if lengths is not None:
+		kilobases = np.asarray(lengths, dtype=np.float64)[:, None] / 1000.0
+		rate = np.zeros(counts.shape)
+		np.divide(counts, kilobases, out=rate, where=(kilobases > 0))
+		blocks.append(rate)
+	return np.hstack(blocks)
+
+# Every metric from pathway totals of the geneBase quantities and the organism wide normalizers:
+	# genes (number of genes), readTotals and rateTotals (per timepoint totals over all genes, rateTotals None without lengths)
+	# Returns (metric names, pathways x (metrics * timepoints) block)
+def finishMetrics(baseSums, timepoints, genes, readTotals, rateTotals=None):
+	metrics = ['raw', 'proportional']
+	blocks = [baseSums[:, :timepoints], baseSums[:, timepoints:2 * timepoints] / float(max(genes, 1))]
+	if rateTotals is not None:
+		rate = baseSums[:, 2 * timepoints:3 * timepoints]
+		blocks.append(relativeTotals(rate, rateTotals) * 1e6)
+		blocks.append(relativeTotals(rate, readTotals) * 1e6)
+		metrics += lengthMetrics
+	return metrics, np.hstack(blocks)
+
+# Columns of one metric, limited to its first timepoints, in a block stacked by finishMetrics
+def metricColumns(metrics, metric, timepoints, count=None):
+	start = metrics.index(metric) * timepoints
+	return np.arange(start, start + (timepoints if count is None else count))
+
+# Builds a children x parents matrix with a 1.0 wherever the child label is listed under the parent
+	# e.g. pathways x subNetworks from subNetworkTrackDict, or subNetworks x networks from networkTrackDict
+def rollupMatrix(childLabels, parentLabels, trackDict):
+	rows = dict((childLabels[i], i) for i in range(len(childLabels)))
+	rollup = np.zeros((len(childLabels), len(parentLabels)))
+	for column in range(len(parentLabels)):
+		for child in set(trackDict[parentLabels[column]]):
+			if child in rows:
+				rollup[rows[child], column] = 1.0
+	return rollup
+
+# Rolls pathways x timepoints sums (membership.T.dot(values) for a genes x timepoints value matrix or its accumulated sums) up every level for all timepoints at once
+	# Each gene -> pathway -> subNetwork -> network chain contributes once, as in the original nested loops,
+		# so a pathway reached through two subNetworks is counted for both
+	# Returns (networks x timepoints, subNetworks x timepoints, pathways x timepoints)
+def rollupTotals(pathwaySums, pathwayToSubNetwork, subNetworkToNetwork):
+	subNetworkSums = pathwayToSubNetwork.T.dot(pathwaySums)
+	networkTotals = subNetworkToNetwork.T.dot(subNetworkSums)
+	# Number of chains leaving each subNetwork/pathway
+	subNetworkChains = subNetworkToNetwork.sum(axis=1)
+	pathwayChains = pathwayToSubNetwork.dot(subNetworkChains)
+	return networkTotals, subNetworkSums * subNetworkChains[:, None], pathwaySums * pathwayChains[:, None]
+
+# Totals of every node of a depth first ordered tree, for trees of any depth
+	# Gene values are added to the nodes listing them (geneRows[i] at treeNodes[i]), then a single prefix sum over the nodes
+		# gives each node's subtree total as the difference of two prefix sums, since a subtree is the node range i:treeEnd[i]
+	# Returns nodes x columns totals
+def subtreeTotals(values, geneRows, treeNodes, treeEnd):
+	nodeValues = np.zeros((len(treeEnd), values.shape[1]))
+	np.add.at(nodeValues, treeNodes, values[geneRows])
+	prefix = np.zeros((len(treeEnd) + 1, values.shape[1]))
+	np.cumsum(nodeValues, axis=0, out=prefix[1:])
+	return prefix[treeEnd] - prefix[:-1]
+
+# Totals of the nodes of one depth added up per label, nodes without a label (leaves) are left out
+	# Returns the label IDs in order of first appearance and their labels x columns totals
+def depthTotals(nodeTotals, treeDepth, treeLabel, depth):
+	nodes = np.flatnonzero((treeDepth == depth) & (treeLabel >= 0))
+	labelIDs, first, inverse = np.unique(treeLabel[nodes], return_index=True, return_inverse=True)
+	order = np.argsort(first)
+	rank = np.empty(len(order), dtype=np.int64)
+	rank[order] = np.arange(len(order))
+	totals = np.zeros((len(labelIDs), nodeTotals.shape[1]))
+	np.add.at(totals, rank[inverse], nodeTotals[nodes])
+	return labelIDs[order], totals
+
+# Divides level totals by the total expression of each timepoint, timepoints without expression stay at 0.0
+def relativeTotals(totals, expression):
+	relative = np.zeros(totals.shape)
+	np.divide(totals, expression, out=relative, where=(expression != 0))
+	return relative
+
+# Orders prunedLevel can keep the top categories by: share (total over organisms) or variance across organisms
+levelRankings = ['share', 'variance']
+
+# One level's labels and labels x organisms values made ready to draw or export in one vectorised pass, for any number of organisms
+	# Rows 0.0 for every organism are dropped (dropEmpty), and labels are sorted once
+	# With top, only the top categories by rankBy are kept (ties keep label order), still listed in label order
+	# Returns (sorted labels, their labels x organisms values)
+def prunedLevel(labels, values, top=None, rankBy='share', dropEmpty=True):
+	if rankBy not in levelRankings:
+		raise ValueError("Unknown ranking "+str(rankBy)+", expected one of "+", ".join(levelRankings))
+	labels = np.array(labels, dtype=str)
+	values = np.asarray(values, dtype=np.float64)
+	kept = np.argsort(labels, kind='stable')
+	if dropEmpty:
+		kept = kept[values[kept].any(axis=1)]
+	if top is not None and top < len(kept):
+		score = values[kept].var(axis=1) if rankBy == 'variance' else values[kept].sum(axis=1)
+		kept = kept[np.sort(np.argsort(-score, kind='stable')[:top])]
+	return labels[kept].tolist(), values[kept]
+
+# Builds a combined dictionary for one timepoint with values being n-dimensional lists where n is number of organisms examined
+def combinedDict(labels, organismTotals, timepoint):
+	combined = {}
+	for i in range(len(labels)):
+		combined[labels[i]] = [float(totals[i, timepoint]) for totals in organismTotals]
+	return combined
@@ -0,0 +1,283 @@
+# Resource distributions of several organisms over the KEGG levels, callable in process
+	# A distribution holds the label order of every level and, per organism, level totals of every metric for all timepoints
+		# relativeDistribution follows networkGraphing.py (locus index, first hit per locus, values relative to total expression)
+		# traversalDistribution follows networkGraphing_hardCode.py (manual traversal, genes counted in every pathway)
+		# treeDistribution rolls the whole tree up to any depth, levels beyond pathways included
+		# koDistribution aligns organisms on the KEGG orthology (KO) of their genes instead of pathway labels
+	# With incremental, per-organism results are cached and only organisms whose inputs changed are recomputed before the merge
+	# With a chunkSize, count files are streamed in blocks of that many rows so memory stays bounded whatever their size
+	# attribution picks how genes listed in several pathways count (keggIndex.attributionPolicies), each method keeps its own by default
+	# Timepoints are named after the count file header columns
+	# Nothing here imports matplotlib or pandas, charts are drawn by rendering.renderCharts only when asked for
+
+import os
+import numpy as np
+from . import diskCache
+from .profiling import nullProfiler
+from .countFiles import clearCountCache
+from .aggregation import rollupMatrix, rollupTotals, relativeTotals, metricNames, lengthMetrics, metricColumns
+from .pipeline import indexedOrganism, traversedOrganism, treeOrganism, koOrganism, runOrganisms, mergeOrganisms, pathwayMatrix
+
+levelNames = ['Network', 'SubNetwork', 'Pathway']
+
+# Reads a directory file, JSON files are in the first tab separated column and count files in the second
+def readFileList(path):
+	jsonFileList = []
+	countFileList = []
+	with open(path) as d:
+		for line in d:
+			line = line.rstrip()
+			line = line.split("\t")
+			jsonFileList.append(line[0])
+			countFileList.append(line[1])
+	return jsonFileList, countFileList
+
+# Unique organism names based off of KEGG organism IDs
+def organismName(jsonFile):
+	return os.path.basename(jsonFile)[0:3]
+
+# Empties the parsed KEGG map (hierarchy=True), count matrix and organism result caches of one organism
+def clearCaches(jsonFile, countFile, hierarchy=True):
+	if hierarchy:
+		diskCache.clearCache(jsonFile, "hierarchy")
+	clearCountCache(countFile)
+	for function in [indexedOrganism, traversedOrganism, treeOrganism, koOrganism]:
+		diskCache.clearCache(countFile, "result."+function.__name__)
+
+# Final function to check if a given dictionary contains values for at least one KEGG category
+def cleanDict(checkDict):
+	for i in list(checkDict.keys()):
+		if float(sum(checkDict[i])) == 0.0:
+			del checkDict[i]
+	return checkDict
+
+# Merges per-organism results and builds the rollup matrices shared by all organisms
+def _mergedLevels(resultList, dropNetworks=()):
+	# Basic holding structure for respective levels of KEGG pathway, merged in fileList order
+	networkTrackDict, subNetworkTrackDict, pathwayLabels = mergeOrganisms(resultList)
+	for network in dropNetworks:
+		networkTrackDict.pop(network, None)
+	networkLabels = list(networkTrackDict)
+	subNetworkLabels = list(subNetworkTrackDict)
+	# Checks for minimum dimensionality of count data
+	minTimepoints = min(len(result['columns']) for result in resultList)
+	pathwayToSubNetwork = rollupMatrix(pathwayLabels, subNetworkLabels, subNetworkTrackDict)
+	subNetworkToNetwork = rollupMatrix(subNetworkLabels, networkLabels, networkTrackDict)
+	return [networkLabels, subNetworkLabels, pathwayLabels], minTimepoints, pathwayToSubNetwork, subNetworkToNetwork
+
+# Sampling time names from the count file headers, organisms naming a column differently are joined with "/"
+def timepointLabels(resultList, minTimepoints):
+	return [joinedTimepoint([result['columns'][timepoint] for result in resultList], timepoint) for timepoint in range(minTimepoints)]
+
+# One name for a timepoint named differently by several count files, each distinct name once joined with "/"
+	# Positional names of count files without a header ("1", "2", ...) are only used when no file names the column
+def joinedTimepoint(names, timepoint):
+	distinct = []
+	for name in names:
+		if name not in distinct:
+			distinct.append(name)
+	named = [name for name in distinct if name != str(timepoint + 1)]
+	return "/".join(named if named else distinct)
+
+def _distribution(method, jsonFileList, labels, minTimepoints, rollup, metrics, totals, expression, resultList, attribution='full'):
+	return {'method': method, 'organisms': [organismName(jsonFile) for jsonFile in jsonFileList], 'levels': list(levelNames),
+			'labels': labels, 'timepoints': minTimepoints, 'timepointLabels': timepointLabels(resultList, minTimepoints),
+			'rollup': rollup, 'attribution': attribution, 'metrics': metrics, 'totals': totals, 'expression': expression,
+			'genes': [result['genes'] for result in resultList]}
+
+# Metrics every organism has, length normalized ones need an id_len column in every count file
+def _commonMetrics(resultList):
+	return [metric for metric in metricNames if all(metric in result['metrics'] for result in resultList)]
+
+# Rolls one organism's pathway totals of every metric up every level in a single pass over all metrics and timepoints
+	# Returns {metric: (networks x timepoints, subNetworks x timepoints, pathways x timepoints)}
+def _metricTotals(result, pathwayLabels, metrics, minTimepoints, pathwayToSubNetwork, subNetworkToNetwork):
+	columns = np.concatenate([metricColumns(result['metrics'], metric, len(result['columns']), minTimepoints) for metric in metrics])
+	stacked = rollupTotals(pathwayMatrix(result, pathwayLabels, None)[:, columns], pathwayToSubNetwork, subNetworkToNetwork)
+	totals = {}
+	for i in range(len(metrics)):
+		block = slice(i * minTimepoints, (i + 1) * minTimepoints)
+		totals[metrics[i]] = tuple(levelCounts[:, block] for levelCounts in stacked)
+	return totals
+
+# Each organism reads its count file, opens its JSON (or the cached parse of both), places every locus through the locus index
+	# and sums every metric per pathway. Totals of every level are relative to the total of the metric over the organism's hierarchy
+def relativeDistribution(jsonFileList, countFileList, useCache=True, jobs=1, profiler=nullProfiler, incremental=False, chunkSize=None,
+							attribution='first'):
+	with profiler.stage("organisms"):
+		resultList = runOrganisms(indexedOrganism, jsonFileList, countFileList, useCache=useCache, jobs=jobs, profiler=profiler,
+								incremental=incremental, chunkSize=chunkSize, attribution=attribution)
+	return relativeFromResults(jsonFileList, resultList, profiler, attribution)
+
+# Merge and rollup of relativeDistribution, for indexedOrganism results computed elsewhere
+def relativeFromResults(jsonFileList, resultList, profiler=nullProfiler, attribution='first'):
+	with profiler.stage("merge"):
+		labels, minTimepoints, pathwayToSubNetwork, subNetworkToNetwork = _mergedLevels(resultList)
+		metrics = _commonMetrics(resultList)
+	# Rolls counts per pathway up every level for every organism, metric and timepoint at once
+	totals = []
+	expressionList = []
+	for organism in range(len(resultList)):
+		with profiler.stage("rollup", organismName(jsonFileList[organism])):
+			metricTotals = _metricTotals(resultList[organism], labels[2], metrics, minTimepoints, pathwayToSubNetwork, subNetworkToNetwork)
+			relative = {}
+			expression = {}
+			for metric in metrics:
+				# Total expression per timepoint over every gene -> pathway -> subNetwork -> network hit
+				expression[metric] = metricTotals[metric][0].sum(axis=0)
+				relative[metric] = tuple(relativeTotals(counts, expression[metric]) for counts in metricTotals[metric])
+			totals.append(relative)
+			expressionList.append(expression)
+	return _distribution('relative', jsonFileList, labels, minTimepoints, (pathwayToSubNetwork, subNetworkToNetwork), metrics, totals,
+						expressionList, resultList, attribution)
+
+# Each organism reads its count file, traverses its JSON and sums every metric per pathway
+	# Totals are divided by the total of their metric when combined, except for proportional (the share of the organism's genes
+		# expressed) which is divided by the total read count as -p 1 always did. Brite Hierarchies are removed (redundant/uninformative)
+def traversalDistribution(jsonFileList, countFileList, useCache=True, jobs=1, profiler=nullProfiler, incremental=False, chunkSize=None,
+							attribution='full'):
+	with profiler.stage("organisms"):
+		resultList = runOrganisms(traversedOrganism, jsonFileList, countFileList, useCache=useCache, jobs=jobs, profiler=profiler,
+								incremental=incremental, chunkSize=chunkSize, attribution=attribution)
+	return traversalFromResults(jsonFileList, resultList, profiler, attribution)
+
+# Merge and rollup of traversalDistribution, for traversedOrganism results computed elsewhere
+def traversalFromResults(jsonFileList, resultList, profiler=nullProfiler, attribution='full'):
+	with profiler.stage("merge"):
+		labels, minTimepoints, pathwayToSubNetwork, subNetworkToNetwork = _mergedLevels(resultList, ['Brite\nHierarchies'])
+		metrics = _commonMetrics(resultList)
+	totals = []
+	expressionList = []
+	for organism in range(len(resultList)):
+		with profiler.stage("rollup", organismName(jsonFileList[organism])):
+			metricTotals = _metricTotals(resultList[organism], labels[2], metrics, minTimepoints, pathwayToSubNetwork, subNetworkToNetwork)
+			expression = dict((metric, metricTotals[metric][0].sum(axis=0)) for metric in metrics)
+			# Total expression of proportional counts follows the read counts
+			expression['proportional'] = expression['raw']
+			totals.append(metricTotals)
+			expressionList.append(expression)
+	return _distribution('traversal', jsonFileList, labels, minTimepoints, (pathwayToSubNetwork, subNetworkToNetwork), metrics, totals,
+						expressionList, resultList, attribution)
+
+# Name of a tree depth, the first three are the usual levels
+def depthName(depth):
+	if depth <= len(levelNames):
+		return levelNames[depth - 1]
+	return "Depth "+str(depth)
+
+# Each organism's whole tree, at any depth, is rolled up in one pass over its genes (pipeline.treeOrganism)
+	# Totals of the given depths (every category depth of the maps by default) are relative to the total of the metric
+		# over the top level categories, and combine like relativeDistribution's
+def treeDistribution(jsonFileList, countFileList, depths=None, useCache=True, jobs=1, profiler=nullProfiler, incremental=False, chunkSize=None):
+	with profiler.stage("organisms"):
+		resultList = runOrganisms(treeOrganism, jsonFileList, countFileList, useCache=useCache, jobs=jobs, profiler=profiler,
+								incremental=incremental, chunkSize=chunkSize)
+	with profiler.stage("merge"):
+		if depths is None:
+			depths = list(range(1, max(len(result['depthLabels']) for result in resultList) + 1))
+		labels = []
+		for depth in depths:
+			merged = []
+			seen = set()
+			for result in resultList:
+				for label in (result['depthLabels'][depth - 1] if depth <= len(result['depthLabels']) else []):
+					if label not in seen:
+						seen.add(label)
+						merged.append(label)
+			labels.append(merged)
+		minTimepoints = min(len(result['columns']) for result in resultList)
+		metrics = _commonMetrics(resultList)
+	totals = []
+	expressionList = []
+	for organism in range(len(resultList)):
+		with profiler.stage("rollup", organismName(jsonFileList[organism])):
+			result = resultList[organism]
+			levelSums = [_depthMatrix(result, depth, labels[i]) for i, depth in zip(range(len(depths)), depths)]
+			topSums = result['depthSums'][0].sum(axis=0) if result['depthSums'] else np.zeros(len(result['metrics']) * len(result['columns']))
+			relative = {}
+			expression = {}
+			for metric in metrics:
+				columns = metricColumns(result['metrics'], metric, len(result['columns']), minTimepoints)
+				expression[metric] = topSums[columns]
+				relative[metric] = tuple(relativeTotals(sums[:, columns], expression[metric]) for sums in levelSums)
+			totals.append(relative)
+			expressionList.append(expression)
+	distribution = _distribution('tree', jsonFileList, labels, minTimepoints, None, metrics, totals, expressionList, resultList)
+	distribution['levels'] = [depthName(depth) for depth in depths]
+	return distribution
+
+# One organism's labels x (metrics * timepoints) totals of a depth on the shared label order
+def _depthMatrix(result, depth, labels):
+	matrix = np.zeros((len(labels), len(result['metrics']) * len(result['columns'])))
+	if depth <= len(result['depthSums']):
+		rows = dict((labels[i], i) for i in range(len(labels)))
+		matrix[[rows[label] for label in result['depthLabels'][depth - 1]]] = result['depthSums'][depth - 1]
+	return matrix
+
+# Each organism's genes are summed per KO (pipeline.koOrganism), then every organism is joined on the KO IDs at once:
+	# the KO lists are concatenated, np.unique gives the shared sorted KO order and each organism's position in it,
+		# and all organisms' sums are scattered into an organisms x KOs x timepoints cube per metric in one assignment
+	# The distribution has a single KO level whose totals are relative to the metric's total over the organism's KO genes,
+		# cube holds the unnormalized metric sums, KOs missing from an organism stay at 0.0
+def koDistribution(jsonFileList, countFileList, useCache=True, jobs=1, profiler=nullProfiler, incremental=False, chunkSize=None):
+	with profiler.stage("organisms"):
+		resultList = runOrganisms(koOrganism, jsonFileList, countFileList, useCache=useCache, jobs=jobs, profiler=profiler,
+								incremental=incremental, chunkSize=chunkSize)
+	with profiler.stage("merge"):
+		minTimepoints = min(len(result['columns']) for result in resultList)
+		metrics = _commonMetrics(resultList)
+		koCounts = np.array([len(result['kos']) for result in resultList], dtype=np.int64)
+		kos, positions = np.unique(np.concatenate([np.array(result['kos'], dtype=str) for result in resultList]),
+									return_inverse=True)
+		organismRows = np.repeat(np.arange(len(resultList)), koCounts)
+		cube = {}
+		for metric in metrics:
+			stacked = np.vstack([result['metricSums'][:, metricColumns(result['metrics'], metric, len(result['columns']), minTimepoints)]
+								for result in resultList])
+			cube[metric] = np.zeros((len(resultList), len(kos), minTimepoints))
+			cube[metric][organismRows, positions] = stacked
+	totals = []
+	expressionList = []
+	for organism in range(len(resultList)):
+		with profiler.stage("rollup", organismName(jsonFileList[organism])):
+			expression = dict((metric, cube[metric][organism].sum(axis=0)) for metric in metrics)
+			totals.append(dict((metric, (relativeTotals(cube[metric][organism], expression[metric]),)) for metric in metrics))
+			expressionList.append(expression)
+	distribution = _distribution('ko', jsonFileList, [kos.tolist()], minTimepoints, None, metrics, totals, expressionList, resultList)
+	distribution['levels'] = ['KO']
+	distribution['cube'] = cube
+	return distribution
+
+# Labels and labels x organisms values of every level for one timepoint and metric, any number of organisms at once
+	# Relative and tree totals are already relative to each organism's total
+	# Traversal totals are divided by each organism's total expression of the metric here, and with two or more organisms
+		# rows 0.0 for every organism are dropped
+	# Returns one (labels, values) pair per level, labels in the distribution's order (aggregation.prunedLevel sorts and prunes them)
+def combinedArrays(distribution, timepoint, metric='raw', profiler=nullProfiler):
+	if metric not in distribution['metrics']:
+		raise ValueError("Metric "+str(metric)+" is not available, "+_missingMetric(metric))
+	labels = distribution['labels']
+	levelList = []
+	with profiler.stage("combine", None, distribution['timepointLabels'][timepoint]):
+		for level in range(len(labels)):
+			values = np.zeros((len(labels[level]), len(distribution['organisms'])))
+			for organism in range(len(distribution['organisms'])):
+				values[:, organism] = distribution['totals'][organism][metric][level][:, timepoint]
+			if distribution['method'] != 'traversal':
+				levelList.append((labels[level], values))
+				continue
+			expression = np.array([expression[metric][timepoint] for expression in distribution['expression']], dtype=np.float64)
+			values = relativeTotals(values, expression)
+			kept = np.flatnonzero(values.any(axis=1)) if values.shape[1] > 1 else np.arange(len(values))
+			levelList.append(([labels[level][i] for i in kept], values[kept]))
+	return levelList
+
+# Shared dictionaries of one metric for one timepoint, one per level, with values being n-dimensional lists where n is number of organisms examined
+	# Returns [network, subNetwork, pathway] dictionaries. Every metric is computed up front, so switching metric recomputes nothing
+def combinedDicts(distribution, timepoint, metric='raw', profiler=nullProfiler):
+	return [dict(zip(labels, values.tolist())) for labels, values in combinedArrays(distribution, timepoint, metric, profiler)]
+
+def _missingMetric(metric):
+	if metric in lengthMetrics:
+		return "it needs an id_len column in every count file"
+	return "expected one of "+", ".join(metricNames)
@@ -0,0 +1,157 @@
+# Batch runs of several input lists in one process, every distinct KEGG map and count file is read once
+	# Input lists are fileLists (a KEGG map and a count file per row, e.g. transcripts and proteins of the same organisms)
+		# or histogram lists (a count file per line, as Transcripts and Proteins)
+	# Parsed maps, count matrices and organism results are kept in memory by path, so a map listed by several lists is parsed once
+		# and an organism listed twice with the same map and count file is mapped once
+	# Every fileList is exported as networkGraphing.py --export would, every histogram list file is saved as a PNG,
+		# and fileLists are compared two by two in paired tables (e.g. transcripts vs proteins) of the same chart values
+	# A manifest lists the inputs, one tab separated row each: name, kind (counts or histogram) and path of the list
+
+import itertools
+import os
+import numpy as np
+from .profiling import nullProfiler
+from .keggIndex import loadHierarchy
+from .countFiles import loadCountFile
+from .pipeline import organismResult
+from .aggregation import prunedLevel
+from .analysis import readFileList, organismName, combinedArrays, joinedTimepoint
+from .export import exportDistribution, writeTable
+from .histogram import readHistogramList, readCountArray, vectorizedHistogram, plotBinnedHistogram
+from .service import serviceMethods
+
+batchKinds = ['counts', 'histogram']
+pairColumns = ['level', 'label', 'timepoint', 'timepointIndex', 'organism', 'metric', 'valueA', 'valueB', 'difference']
+
+# Reads a manifest into (name, kind, path) rows, paths are taken as given like those inside the lists
+def readManifest(path):
+	entries = []
+	with open(path) as f:
+		for line in f:
+			line = line.rstrip()
+			if not line or line.startswith("#"):
+				continue
+			fields = line.split("\t")
+			if len(fields) != 3 or fields[1] not in batchKinds:
+				raise ValueError("Manifest rows are name, kind ("+", ".join(batchKinds)+") and path, got "+repr(line))
+			entries.append((fields[0], fields[1], fields[2]))
+	return entries
+
+# Name of an input list given on the command line, its file name without extension
+def listName(path):
+	return os.path.splitext(os.path.basename(path))[0]
+
+# KEGG maps, count matrices, histogram arrays and organism results of a batch, each read or computed once per path
+class SharedInputs(object):
+	def __init__(self, useCache=True, profiler=nullProfiler):
+		self.useCache = useCache
+		self.profiler = profiler
+		self.hierarchies = {}
+		self.matrices = {}
+		self.arrays = {}
+		self.results = {}
+
+	def hierarchy(self, jsonFile):
+		key = os.path.realpath(jsonFile)
+		if key not in self.hierarchies:
+			with self.profiler.stage("loadMap", organismName(jsonFile)):
+				self.hierarchies[key] = loadHierarchy(jsonFile, useCache=self.useCache)
+		return self.hierarchies[key]
+
+	def matrix(self, countFile):
+		key = os.path.realpath(countFile)
+		if key not in self.matrices:
+			with self.profiler.stage("loadCounts", os.path.basename(countFile)):
+				self.matrices[key] = loadCountFile(countFile, useCache=self.useCache)
+		return self.matrices[key]
+
+	# Count file read as histogram.py reads it (headers are detected, annotation columns dropped)
+	def array(self, countFile):
+		key = os.path.realpath(countFile)
+		if key not in self.arrays:
+			with self.profiler.stage("read", os.path.basename(countFile)):
+				self.arrays[key] = readCountArray(countFile)
+		return self.arrays[key]
+
+	# Pathway totals of one organism for a serviceMethods method
+	def result(self, method, jsonFile, countFile):
+		key = (method, os.path.realpath(jsonFile), os.path.realpath(countFile))
+		if key not in self.results:
+			hierarchy = self.hierarchy(jsonFile)
+			matrix = self.matrix(countFile)
+			with self.profiler.stage("map", organismName(jsonFile)):
+				self.results[key] = organismResult(matrix, serviceMethods[method][0](hierarchy, matrix['loci']))
+		return self.results[key]
+
+	# Distribution of a fileList, as relativeDistribution or traversalDistribution would give it
+	def distribution(self, method, jsonFileList, countFileList):
+		resultList = [self.result(method, jsonFile, countFile) for jsonFile, countFile in zip(jsonFileList, countFileList)]
+		return serviceMethods[method][1](jsonFileList, resultList, self.profiler)
+
+# Chart values of two distributions of the same method side by side, one row per level, label, timepoint and organism in pairColumns order
+	# Organisms of both distributions and their common timepoints are compared, labels missing from one side count as 0.0
+	# Labels empty on both sides are left out, timepoints named differently are joined with "/" (positional names of count
+		# files without a header give way to the other side's names)
+def pairedRows(distributionA, distributionB, metrics=None, profiler=nullProfiler):
+	clean = serviceMethods[distributionA['method']][2]
+	organisms = [organism for organism in distributionA['organisms'] if organism in distributionB['organisms']]
+	if metrics is None:
+		metrics = [metric for metric in distributionA['metrics'] if metric in distributionB['metrics']]
+	for metric in metrics:
+		for timepoint in range(min(distributionA['timepoints'], distributionB['timepoints'])):
+			timepointLabel = joinedTimepoint([distributionA['timepointLabels'][timepoint], distributionB['timepointLabels'][timepoint]], timepoint)
+			levelsA = combinedArrays(distributionA, timepoint, metric, profiler)
+			levelsB = combinedArrays(distributionB, timepoint, metric, profiler)
+			for level in range(len(levelsA)):
+				labelsA, valuesA = prunedLevel(levelsA[level][0], levelsA[level][1], dropEmpty=clean)
+				labelsB, valuesB = prunedLevel(levelsB[level][0], levelsB[level][1], dropEmpty=clean)
+				# Both sides on the union of their labels, one organisms column each
+				labels = sorted(set(labelsA) | set(labelsB))
+				pairedA = _onLabels(labels, labelsA, valuesA[:, [distributionA['organisms'].index(organism) for organism in organisms]])
+				pairedB = _onLabels(labels, labelsB, valuesB[:, [distributionB['organisms'].index(organism) for organism in organisms]])
+				for i, j in zip(*np.nonzero((pairedA != 0.0) | (pairedB != 0.0))):
+					yield (distributionA['levels'][level], labels[i].replace("\n", " "), timepointLabel, timepoint+1, organisms[j], metric,
+							float(pairedA[i, j]), float(pairedB[i, j]), float(pairedA[i, j] - pairedB[i, j]))
+
+# Places labels x columns values on a sorted superset of their labels, missing labels are 0.0
+def _onLabels(allLabels, labels, values):
+	placed = np.zeros((len(allLabels), values.shape[1]))
+	placed[np.searchsorted(np.array(allLabels, dtype=str), np.array(labels, dtype=str))] = values
+	return placed
+
+# Runs every (name, kind, path) input into outDirectory, returns (written path, row count or None for charts) pairs
+	# counts lists: <name>.<method>.<tsv|parquet>, paired with every later counts list in <nameA>_vs_<nameB>.<method>.<tsv|parquet>
+	# histogram lists: <name>.<title>.png per file, titled after the first directory of its path as histogram.py does
+	# metrics are the metrics to write (every one the distributions share by default)
+def runBatch(entries, outDirectory, method='relative', metrics=None, pair=True, format='tsv', bins=100, cutoff=0.9, useCache=True,
+				profiler=nullProfiler, inputs=None):
+	if method not in serviceMethods:
+		raise ValueError("Unknown method "+str(method)+", expected one of "+", ".join(sorted(serviceMethods)))
+	if inputs is None:
+		inputs = SharedInputs(useCache, profiler)
+	if not os.path.isdir(outDirectory):
+		os.makedirs(outDirectory)
+	extension = "."+format
+	written = []
+	distributions = []
+	for name, kind, path in entries:
+		if kind == 'counts':
+			jsonFileList, countFileList = readFileList(path)
+			distribution = inputs.distribution(method, jsonFileList, countFileList)
+			distributions.append((name, distribution))
+			outPath = os.path.join(outDirectory, name+"."+method+extension)
+			written.append((outPath, exportDistribution(distribution, outPath, format, metrics=metrics, profiler=profiler)))
+		else:
+			for title, countFile in readHistogramList(path):
+				with profiler.stage("filter", title):
+					histogram = vectorizedHistogram(inputs.array(countFile), cutoff, bins)
+				outPath = os.path.join(outDirectory, name+"."+title+".png")
+				with profiler.stage("plot", title):
+					plotBinnedHistogram(histogram, "Histogram for "+str(title)+" - "+str(path), save=outPath)
+				written.append((outPath, None))
+	if pair:
+		for (nameA, distributionA), (nameB, distributionB) in itertools.combinations(distributions, 2):
+			outPath = os.path.join(outDirectory, nameA+"_vs_"+nameB+"."+method+extension)
+			with profiler.stage("export"):
+				written.append((outPath, writeTable(pairedRows(distributionA, distributionB, metrics, profiler), outPath, format, pairColumns)))
+	return written
@@ -0,0 +1,359 @@
+# Command line entry points of networkGraphing.py, networkGraphing_hardCode.py, histogram.py, expressionService.py and batchRun.py
+	# Each main takes an argument list (sys.argv by default) so the scripts can also be run in process
+
+import argparse
+from .profiling import makeProfiler
+from .analysis import (readFileList, organismName, clearCaches, relativeDistribution, traversalDistribution, treeDistribution,
+						koDistribution, combinedArrays)
+from .rendering import levelChartJob, renderCharts, smallMultiplesJobs
+from .export import exportDistribution, exportFormats, exportFormat, parquetAvailable, writeTable
+from .statistics import significanceTests, statisticsColumns
+from .service import ExpressionService, serviceMethods, makeServer, socketPathFree
+from .batch import readManifest, listName, runBatch
+from .countStore import loadCountStore, countReportColumns
+from .aggregation import metricNames, levelRankings, prunedLevel
+from .keggIndex import attributionPolicies
+from .histogram import (histogramModes, readHistogramList, readCounts, filterQuantiles, plotHistogram, readCountArray,
+						vectorizedHistogram, streamingHistogram, plotBinnedHistogram)
+
+# Flags shared by both graphing scripts
+def _graphingParser():
+	parser = argparse.ArgumentParser()
+	# Two arguments accepted, -d accepts a directory file with locations of count and pathway files
+		# -g is for only displaying specific levels of the KEGG organism map
+	parser.add_argument("--graphmode", "-g", type=int, required=False, default=99)
+	parser.add_argument("--directory", "-d", type=str, required=True)
+	# Parsed KEGG maps and count files are cached next to them, --noCache bypasses the cache and --clearCache empties it before the run
+	parser.add_argument("--noCache", action="store_true")
+	parser.add_argument("--clearCache", action="store_true")
+	# Caches each organism's totals keyed by its input hashes and the settings, reruns only compute new or changed organisms
+	parser.add_argument("--incremental", "-i", action="store_true")
+	# Streams count files in blocks of this many rows, so memory stays bounded for count files of any length
+	parser.add_argument("--chunkSize", type=int, required=False, default=None)
+	# -j runs JSON parsing, locus mapping, aggregation and chart rendering for several organisms/charts at once in a process pool
+	parser.add_argument("--jobs", "-j", type=int, required=False, default=1)
+	# Also draws one figure per level with a panel for every timepoint
+	parser.add_argument("--smallMultiples", action="store_true")
+	# Records time, CPU, call counts and memory per stage, organism and timepoint into a JSON report (profile.json unless a path is given)
+	parser.add_argument("--profile", type=str, nargs="?", const="profile.json", default=None)
+	# Writes every level x timepoint x organism value to one long format table instead of drawing charts
+		# Parquet for .parquet/.pq paths and TSV otherwise, unless --format is given
+	parser.add_argument("--export", "-e", type=str, required=False, default=None)
+	parser.add_argument("--format", type=str, required=False, default=None, choices=exportFormats)
+	# Value drawn or exported: raw read counts, proportional expressed gene counts, or length normalized TPM/RPKM (needs id_len)
+		# Every metric is computed in the same pass, 'all' exports them all in one table. raw unless given
+	parser.add_argument("--metric", type=str, required=False, default=None, choices=metricNames + ["all"])
+	# How a gene listed under several pathways counts: first listing only (networkGraphing.py default), fully in every pathway
+		# (networkGraphing_hardCode.py default) or split evenly between them
+	parser.add_argument("--attribution", type=str, required=False, default=None, choices=attributionPolicies)
+	# Writes permutation p-values and bootstrap confidence intervals of the read share differences between every pair of organisms
+		# --permutations/--bootstraps replicates per pair, level and timepoint, run in batches over -j processes
+	parser.add_argument("--stats", type=str, required=False, default=None)
+	parser.add_argument("--permutations", type=int, required=False, default=1000)
+	parser.add_argument("--bootstraps", type=int, required=False, default=1000)
+	parser.add_argument("--confidence", type=float, required=False, default=0.95)
+	parser.add_argument("--seed", type=int, required=False, default=0)
+	# Writes the loci listed by several organisms' count files, repeated within one, or missing from the organism's KEGG map
+	parser.add_argument("--countReport", type=str, required=False, default=None)
+	# Keeps only the --top categories of every level and timepoint in charts and exports, ranked by share (total over organisms)
+		# or by variance across organisms
+	parser.add_argument("--top", type=int, required=False, default=None)
+	parser.add_argument("--rankBy", type=str, required=False, default="share", choices=levelRankings)
+	return parser
+
+# Parses the arguments of a graphing script and checks the flags _graphingParser adds
+def _parseGraphingArgs(parser, argv):
+	args = parser.parse_args(argv)
+	if args.top is not None and args.top < 1:
+		parser.error("--top expects 1 or more categories")
+	if args.incremental and args.noCache:
+		parser.error("--incremental keeps its results in the cache and cannot be combined with --noCache")
+	# Tables are written after the analysis, so a missing Parquet engine is reported before any work is done
+	outputs = [path for path in (args.export, args.stats, args.countReport) if path is not None]
+	if any((args.format or exportFormat(path)) == 'parquet' for path in outputs) and not parquetAvailable():
+		parser.error("Parquet export requires pyarrow or fastparquet")
+	return args
+
+# Metrics asked for on the command line, checked against those the count files allow
+def _selectedMetrics(parser, args, distribution, metric):
+	if metric == "all":
+		if args.export is None:
+			parser.error("--metric all is only available with --export")
+		return distribution['metrics']
+	if metric not in distribution['metrics']:
+		parser.error("metric "+metric+" needs an id_len column in every count file")
+	return [metric]
+
+# Comma separated tree depths, 1 being the networks
+def _depthList(parser, depths):
+	try:
+		depthList = [int(depth) for depth in depths.split(",")]
+	except ValueError:
+		depthList = []
+	if not depthList or min(depthList) < 1:
+		parser.error("--depths expects comma separated depths of 1 or more, e.g. 1,2,3,4")
+	return depthList
+
+# Charts are queued here and drawn together by renderCharts once every timepoint is computed
+	# Charts are titled after timepointLabel, the count file header column of the timepoint
+	# levelValues is a (labels, values) pair from aggregation.prunedLevel, drawn as given
+def displayGraphs(chartJobList, organismList, levelValues = None, timepoint = 0, figSize = (10,6), labSize = 5, yPlotLabel = "Relative Read Distribution as Percent of Total",
+						xPlotLabel = "Pathway", rotate_legend = False, bottom_adj = None, save='', timepointLabel = None):
+	if timepointLabel is None:
+		timepointLabel = "Timepoint "+str(timepoint+1)
+	chartJobList.append(levelChartJob(levelValues[0], levelValues[1], organismList, "Resource Distribution at "+str(timepointLabel), save, timepoint+1,
+		figSize=figSize, labSize=labSize, yPlotLabel=yPlotLabel, xPlotLabel=xPlotLabel, rotate_legend=rotate_legend, bottom_adj=bottom_adj))
+	return chartJobList
+
+# Every level of one timepoint pruned for the charts, one (labels, values) pair per level
+	# Empty categories are dropped from relative charts as cleanDict did, traversal charts are drawn as combined
+def _chartLevels(args, distribution, timepoint, metric, profiler):
+	levelList = combinedArrays(distribution, timepoint, metric, profiler)
+	with profiler.stage("prune", None, distribution['timepointLabels'][timepoint]):
+		return [prunedLevel(labels, values, args.top, args.rankBy, distribution['method'] != 'traversal') for labels, values in levelList]
+
+# Significance tests are written before the charts or export, TSV or Parquet as for --export
+def _writeStatistics(args, distribution, jsonFileList, countFileList, profiler):
+	rows = significanceTests(distribution, jsonFileList, countFileList, args.permutations, args.bootstraps, args.confidence, args.seed,
+								jobs=args.jobs, useCache=not args.noCache, profiler=profiler)
+	with profiler.stage("export"):
+		rowCount = writeTable(rows, args.stats, args.format, statisticsColumns)
+	print("Wrote "+str(rowCount)+" significance tests to "+str(args.stats))
+
+# Count file report, written before the analysis as TSV or Parquet as for --export
+def _writeCountReport(args, jsonFileList, countFileList, profiler):
+	store, hierarchies = loadCountStore(jsonFileList, countFileList, useCache=not args.noCache, profiler=profiler)
+	rows = store.report(hierarchies)
+	with profiler.stage("export"):
+		writeTable(rows, args.countReport, args.format, countReportColumns)
+	for issue in ['collision', 'duplicate', 'unmapped']:
+		print(str(sum(1 for row in rows if row[0] == issue))+" "+issue+" loci")
+	print("Wrote count file report to "+str(args.countReport))
+
+# Export mode, charts are skipped and matplotlib is never imported
+def _exportAndReport(args, distribution, metrics, profiler, entryPoint):
+	rowCount = exportDistribution(distribution, args.export, args.format, metrics=metrics, top=args.top, rankBy=args.rankBy, profiler=profiler)
+	print("Wrote "+str(rowCount)+" rows to "+str(args.export))
+	if args.profile is not None:
+		profiler.writeReport(args.profile, entryPoint)
+		print(profiler.summary())
+
+# Draws every queued chart on a non-interactive backend, in worker processes with -j
+def _renderAndReport(args, chartJobList, profiler, entryPoint):
+	if args.smallMultiples:
+		chartJobList += smallMultiplesJobs(chartJobList, ['Network', 'SubNetwork', 'Pathway', ''])
+	with profiler.stage("render"):
+		renderCharts(chartJobList, processes=args.jobs, profiler=profiler)
+	if args.profile is not None:
+		profiler.writeReport(args.profile, entryPoint)
+		print(profiler.summary())
+
+def networkGraphingMain(argv=None):
+	parser = _graphingParser()
+	# Exports the given depths of the whole tree (e.g. 1,2,3 or 1,2,3,4 for maps with categories below pathways) instead of
+		# networks/subNetworks/pathways
+	parser.add_argument("--depths", type=str, required=False, default=None)
+	# Exports one row per KEGG orthology (KO) instead, organisms aligned on the KO of their genes
+	parser.add_argument("--ko", action="store_true")
+	args = _parseGraphingArgs(parser, argv)
+	if args.depths is not None and args.ko:
+		parser.error("--depths and --ko cannot be combined")
+	for flag, given in (("--depths", args.depths is not None), ("--ko", args.ko)):
+		if given and (args.export is None or args.stats is not None or args.attribution is not None):
+			parser.error(flag+" is only available with --export and without --stats or --attribution")
+	profiler = makeProfiler(args.profile is not None)
+	jsonFileList, countFileList = readFileList(args.directory)
+	for i in range(len(jsonFileList)):
+		if args.clearCache:
+			clearCaches(jsonFileList[i], countFileList[i])
+		print("Establishing pathway map for "+str(organismName(jsonFileList[i]))+". . .")
+	if args.countReport is not None:
+		_writeCountReport(args, jsonFileList, countFileList, profiler)
+	if args.depths is not None:
+		distribution = treeDistribution(jsonFileList, countFileList, _depthList(parser, args.depths), useCache=not args.noCache, jobs=args.jobs,
+										profiler=profiler, incremental=args.incremental, chunkSize=args.chunkSize)
+	elif args.ko:
+		distribution = koDistribution(jsonFileList, countFileList, useCache=not args.noCache, jobs=args.jobs, profiler=profiler,
+										incremental=args.incremental, chunkSize=args.chunkSize)
+	else:
+		distribution = relativeDistribution(jsonFileList, countFileList, useCache=not args.noCache, jobs=args.jobs, profiler=profiler,
+										incremental=args.incremental, chunkSize=args.chunkSize, attribution=args.attribution or 'first')
+	metrics = _selectedMetrics(parser, args, distribution, args.metric or "raw")
+	if args.stats is not None:
+		_writeStatistics(args, distribution, jsonFileList, countFileList, profiler)
+	if args.export is not None:
+		return _exportAndReport(args, distribution, metrics, profiler, "networkGraphing.py")
+	organismList = distribution['organisms']
+
+	chartJobList = []
+	for timepoint in range(distribution['timepoints']):
+		timepointLabel = distribution['timepointLabels'][timepoint]
+		print("Cleaning graph output for "+str(timepointLabel)+". . .")
+		network, subNetwork, pathway = _chartLevels(args, distribution, timepoint, metrics[0], profiler)
+		# graphing function for networks only
+		if args.graphmode == 1:
+			displayGraphs(chartJobList, organismList, levelValues=network, timepoint=timepoint, figSize=(10,6), timepointLabel=timepointLabel)
+		# graphing function for subnetworks only
+		elif args.graphmode == 2:
+			displayGraphs(chartJobList, organismList, levelValues=subNetwork, timepoint=timepoint, figSize=(15,6), rotate_legend=True, bottom_adj=0.31, timepointLabel=timepointLabel)
+		# graphing function for pathways only
+		elif args.graphmode == 3:
+			displayGraphs(chartJobList, organismList, levelValues=pathway, timepoint=timepoint, figSize=(15,6), rotate_legend=True, bottom_adj=0.40, timepointLabel=timepointLabel)
+		# graphing function for networks, subnetworks, and pathways (default)
+		else:
+			displayGraphs(chartJobList, organismList, levelValues=network, timepoint=timepoint, figSize=(10,6), save='Network', timepointLabel=timepointLabel)
+			displayGraphs(chartJobList, organismList, levelValues=subNetwork, timepoint=timepoint, figSize=(15,6), rotate_legend=True, bottom_adj=0.31, save='SubNetwork', timepointLabel=timepointLabel)
+			displayGraphs(chartJobList, organismList, levelValues=pathway, timepoint=timepoint, figSize=(15,6), rotate_legend=True, bottom_adj=0.40, save='Pathway', timepointLabel=timepointLabel)
+	_renderAndReport(args, chartJobList, profiler, "networkGraphing.py")
+
+def hardCodeMain(argv=None):
+	parser = _graphingParser()
+	parser.add_argument("--proportionalCount", "-p", type=int, required=False, default=0)
+	args = _parseGraphingArgs(parser, argv)
+	if args.proportionalCount == 1 and args.metric is not None:
+		parser.error("-p 1 selects the proportional metric and cannot be combined with --metric")
+	profiler = makeProfiler(args.profile is not None)
+	jsonFileList, countFileList = readFileList(args.directory)
+	if args.clearCache:
+		for i in range(len(jsonFileList)):
+			clearCaches(jsonFileList[i], countFileList[i])
+	if args.countReport is not None:
+		_writeCountReport(args, jsonFileList, countFileList, profiler)
+	distribution = traversalDistribution(jsonFileList, countFileList, useCache=not args.noCache, jobs=args.jobs, profiler=profiler,
+										incremental=args.incremental, chunkSize=args.chunkSize, attribution=args.attribution or 'full')
+	# -p 1 is the proportional metric
+	metrics = _selectedMetrics(parser, args, distribution, "proportional" if args.proportionalCount == 1 else args.metric or "raw")
+	if args.stats is not None:
+		_writeStatistics(args, distribution, jsonFileList, countFileList, profiler)
+	if args.export is not None:
+		return _exportAndReport(args, distribution, metrics, profiler, "networkGraphing_hardCode.py")
+	organismList = distribution['organisms']
+
+	chartJobList = []
+	for timepoint in range(distribution['timepoints']):
+		labels = {'yPlotLabel': "Total Read Count", 'xPlotLabel': "Pathway/Network", 'timepointLabel': distribution['timepointLabels'][timepoint]}
+		network, subNetwork, pathway = _chartLevels(args, distribution, timepoint, metrics[0], profiler)
+		# graphing function for networks only
+		if args.graphmode == 1:
+			displayGraphs(chartJobList, organismList, levelValues=network, timepoint=timepoint, figSize=(10,6), save='Network', **labels)
+		# graphing function for pathways only
+		elif args.graphmode == 2:
+			displayGraphs(chartJobList, organismList, levelValues=pathway, timepoint=timepoint, figSize=(15,6), rotate_legend=True, bottom_adj=0.37, save='Pathway', **labels)
+		# graphing function for subnetworks only
+		elif args.graphmode == 3:
+			displayGraphs(chartJobList, organismList, levelValues=subNetwork, timepoint=timepoint, figSize=(15,6), rotate_legend=True, bottom_adj=0.31, save='SubNetwork', **labels)
+		# graphing function for networks, subnetworks, and pathways (default)
+		else:
+			displayGraphs(chartJobList, organismList, levelValues=network, timepoint=timepoint, figSize=(10,6), save='Network', **labels)
+			displayGraphs(chartJobList, organismList, levelValues=subNetwork, timepoint=timepoint, figSize=(15,6), rotate_legend=True, bottom_adj=0.31, save='SubNetwork', **labels)
+			displayGraphs(chartJobList, organismList, levelValues=pathway, timepoint=timepoint, figSize=(15,6), rotate_legend=True, bottom_adj=0.37, save='Pathway', **labels)
+	_renderAndReport(args, chartJobList, profiler, "networkGraphing_hardCode.py")
+
+def histogramMain(argv=None):
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--directory", "-d", type=str, required=True, default=0)
+	parser.add_argument("--bins", "-b", type=int, required=False, default=100)
+	# Loci at or above this quantile of a timepoint are left out
+	parser.add_argument("--cutoff", "-c", type=float, required=False, default=0.9)
+	# sequential filters one timepoint after the other with pandas, vectorized computes every cutoff on the whole matrix in one pass
+		# and streaming does the same over --chunkSize row reads with cutoffs from a --sketchSize row sample
+	parser.add_argument("--mode", "-m", type=str, required=False, default="sequential", choices=histogramModes)
+	parser.add_argument("--chunkSize", type=int, required=False, default=100000)
+	parser.add_argument("--sketchSize", type=int, required=False, default=100000)
+	# Records time, CPU, call counts and memory per stage and file into a JSON report (profile.json unless a path is given)
+	parser.add_argument("--profile", type=str, nargs="?", const="profile.json", default=None)
+	args = parser.parse_args(argv)
+	profiler = makeProfiler(args.profile is not None)
+
+	for title, path in readHistogramList(args.directory):
+		plotTitle = "Histogram for "+str(title)+" - "+str(args.directory)
+		if args.mode == "sequential":
+			with profiler.stage("read", title):
+				df = readCounts(path)
+			with profiler.stage("filter", title):
+				df = filterQuantiles(df, args.cutoff)
+			with profiler.stage("plot", title):
+				plotHistogram(df, plotTitle, args.bins)
+			continue
+		if args.mode == "vectorized":
+			with profiler.stage("read", title):
+				values = readCountArray(path)
+			with profiler.stage("filter", title):
+				histogram = vectorizedHistogram(values, args.cutoff, args.bins)
+		else:
+			with profiler.stage("filter", title):
+				histogram = streamingHistogram(path, args.cutoff, args.bins, args.chunkSize, args.sketchSize)
+		print(str(title)+": "+str(histogram['kept'])+" of "+str(histogram['total'])+" loci below the "+str(args.cutoff)+" quantile of every timepoint")
+		with profiler.stage("plot", title):
+			plotBinnedHistogram(histogram, plotTitle)
+
+	if args.profile is not None:
+		profiler.writeReport(args.profile, "histogram.py")
+		print(profiler.summary())
+
+def serviceMain(argv=None):
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--directory", "-d", type=str, required=True)
+	# Answers on 127.0.0.1:--port, or on a Unix socket at --socket
+	parser.add_argument("--port", type=int, required=False, default=8765)
+	parser.add_argument("--socket", type=str, required=False, default=None)
+	parser.add_argument("--noCache", action="store_true")
+	args = parser.parse_args(argv)
+	# Checked before the organisms are loaded, only a stale socket is ever replaced
+	if args.socket is not None and not socketPathFree(args.socket):
+		parser.error(args.socket+" exists and is not a socket")
+	jsonFileList, countFileList = readFileList(args.directory)
+	service = ExpressionService(jsonFileList, countFileList, useCache=not args.noCache)
+	# Both distributions are built up front so the first queries do not pay for the mapping
+	for method in serviceMethods:
+		service.distribution(method)
+	server = makeServer(service, args.port, socketPath=args.socket)
+	print("Serving "+str(len(jsonFileList))+" organisms on "+(args.socket if args.socket is not None else "http://127.0.0.1:"+str(args.port)))
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+
+def batchMain(argv=None):
+	parser = argparse.ArgumentParser()
+	# fileLists (-d) and histogram lists (-H) may be repeated, a manifest (-m) lists further ones as name, kind and path rows
+	parser.add_argument("--directory", "-d", type=str, action="append", default=[])
+	parser.add_argument("--histogram", "-H", type=str, action="append", default=[])
+	parser.add_argument("--manifest", "-m", type=str, required=False, default=None)
+	parser.add_argument("--out", "-o", type=str, required=False, default="batch")
+	parser.add_argument("--method", type=str, required=False, default="relative", choices=sorted(serviceMethods))
+	parser.add_argument("--metric", type=str, required=False, default="raw", choices=metricNames + ["all"])
+	parser.add_argument("--format", type=str, required=False, default="tsv", choices=exportFormats)
+	# fileLists are paired two by two (e.g. transcripts vs proteins) unless --noPair is given
+	parser.add_argument("--noPair", action="store_true")
+	parser.add_argument("--bins", "-b", type=int, required=False, default=100)
+	parser.add_argument("--cutoff", "-c", type=float, required=False, default=0.9)
+	parser.add_argument("--noCache", action="store_true")
+	parser.add_argument("--profile", type=str, nargs="?", const="profile.json", default=None)
+	args = parser.parse_args(argv)
+	if args.format == 'parquet' and not parquetAvailable():
+		parser.error("Parquet export requires pyarrow or fastparquet")
+	entries = [(listName(path), 'counts', path) for path in args.directory] + [(listName(path), 'histogram', path) for path in args.histogram]
+	if args.manifest is not None:
+		try:
+			entries += readManifest(args.manifest)
+		except ValueError as error:
+			parser.error(str(error))
+	if not entries:
+		parser.error("nothing to run, give -d, -H or -m")
+	names = [(name, kind) for name, kind, path in entries]
+	if len(set(names)) < len(names):
+		parser.error("input lists of the same kind need distinct names")
+	profiler = makeProfiler(args.profile is not None)
+	try:
+		written = runBatch(entries, args.out, args.method, None if args.metric == "all" else [args.metric], not args.noPair, args.format,
+							args.bins, args.cutoff, not args.noCache, profiler)
+	except ValueError as error:
+		parser.error(str(error))
+	for path, rowCount in written:
+		print("Wrote "+(str(rowCount)+" rows to " if rowCount is not None else "")+str(path))
+	if args.profile is not None:
+		profiler.writeReport(args.profile, "batchRun.py")
+		print(profiler.summary())
@@ -0,0 +1,140 @@
+# Loading of count matrices into typed NumPy storage
+	# Each count file is parsed once into a genes x timepoints float block with a separate locus index
+	# The block is written as a .npy sidecar in the cache directory which later runs memory-map without any parsing
+
+import itertools
+import numpy as np
+from . import diskCache
+
+# Annotation columns carried by some count files, they are not timepoints
+annotationColumns = ['id_fn', 'id_number', 'id_len']
+
+# Bumped whenever parseCountFile changes what it produces, which invalidates existing sidecars
+loaderVersion = 2
+
+# Converts rows of count strings, values that cannot be read as numbers are counted as 0.0
+def _toFloat(rows, dtype):
+	try:
+		return np.array(rows, dtype=dtype)
+	except ValueError:
+		counts = np.zeros((len(rows), len(rows[0]) if rows else 0), dtype=dtype)
+		for row in range(len(rows)):
+			for column in range(len(rows[row])):
+				try:
+					counts[row, column] = float(rows[row][column])
+				except ValueError:
+					continue
+		return counts
+
+# Header of a count file: timepoint/sample columns and the id_len column, if any, by position
+def _countLayout(header):
+	countPositions = [i for i in range(1, len(header)) if header[i] not in annotationColumns]
+	lengthPosition = header.index('id_len') if 'id_len' in header else None
+	return countPositions, lengthPosition
+
+# A first line whose first count column is not a number is a header, as histogram.py decides
+def _isHeader(fields):
+	try:
+		float(fields[1])
+		return False
+	except (ValueError, IndexError):
+		return True
+
+# Reads the first line of an open count file, returns (countPositions, lengthPosition, columns, data lines)
+	# Files without a header keep their first line as data, their timepoints are the leading numeric columns of that line
+		# (annotation columns after them are skipped) named by position ("1", "2", ...), and they have no id_len column
+def _readLayout(f):
+	first = f.readline()
+	fields = first.rstrip("\n").rstrip("\r").split("\t")
+	if _isHeader(fields):
+		countPositions, lengthPosition = _countLayout(fields)
+		return countPositions, lengthPosition, [fields[i] for i in countPositions], f
+	countPositions = []
+	for i in range(1, len(fields)):
+		try:
+			float(fields[i])
+		except ValueError:
+			break
+		countPositions.append(i)
+	return countPositions, None, [str(i) for i in countPositions], itertools.chain([first], f)
+
+# Parses up to maxRows data lines of an open count file, returns (loci, counts, lengths)
+	# Lengths are None when the file has no id_len column
+def _parseRows(f, countPositions, lengthPosition, dtype, maxRows=None):
+	loci = []
+	rows = []
+	lengths = []
+	for line in f:
+		line = line.rstrip("\n").rstrip("\r")
+		if not line:
+			continue
+		line = line.split("\t")
+		loci.append(line[0])
+		rows.append([line[i] if i < len(line) else "0" for i in countPositions])
+		if lengthPosition is not None:
+			try:
+				lengths.append(int(float(line[lengthPosition])))
+			except (ValueError, IndexError):
+				lengths.append(0)
+		if maxRows is not None and len(loci) >= maxRows:
+			break
+	counts = _toFloat(rows, dtype).reshape(len(loci), len(countPositions))
+	return loci, counts, np.array(lengths, dtype=np.int64) if lengthPosition is not None else None
+
+# Parses a tab separated count matrix whose first column holds the locus IDs, with or without a header line
+	# Returns a dictionary holding
+		# loci: locus IDs in file order
+		# index: locus ID -> row (a repeated locus points at its last row)
+		# columns: timepoint/sample labels from the header, or their positions without one
+		# counts: genes x timepoints array of the given dtype
+		# lengths: integer id_len column, or None if the file has none
+def parseCountFile(path, dtype=np.float64):
+	with open(path) as f:
+		countPositions, lengthPosition, columns, lines = _readLayout(f)
+		loci, counts, lengths = _parseRows(lines, countPositions, lengthPosition, dtype)
+	return {'loci': loci,
+			'index': dict((loci[i], i) for i in range(len(loci))),
+			'columns': columns,
+			'counts': counts,
+			'lengths': lengths}
+
+# Reads a count file in blocks of at most chunkSize rows, so memory stays bounded whatever the file size
+	# Yields dictionaries with the loci, counts, lengths and columns of each block, in file order
+def countFileChunks(path, chunkSize=100000, dtype=np.float64):
+	with open(path) as f:
+		countPositions, lengthPosition, columns, lines = _readLayout(f)
+		first = True
+		while True:
+			loci, counts, lengths = _parseRows(lines, countPositions, lengthPosition, dtype, chunkSize)
+			# A file without rows still yields one empty block carrying its columns
+			if not loci and not first:
+				return
+			first = False
+			yield {'loci': loci, 'counts': counts, 'lengths': lengths, 'columns': columns}
+
+# Loads a count matrix, memory-mapping the cached .npy sidecar when one exists for the current file
+	# Sidecars are keyed by file size and modification time so the file itself is not read again
+def loadCountFile(path, dtype=np.float64, useCache=True):
+	if not useCache:
+		return parseCountFile(path, dtype)
+	key = diskCache.fileStamp(path)+"."+np.dtype(dtype).name
+	indexEntry = diskCache.cachePath(path, "countIndex", key, loaderVersion)
+	countEntry = diskCache.cachePath(path, "counts", key, loaderVersion, extension="npy")
+	matrix = diskCache.readCache(indexEntry)
+	if matrix is not None:
+		matrix['counts'] = diskCache.readArray(countEntry)
+		if matrix['counts'] is not None:
+			return matrix
+	matrix = parseCountFile(path, dtype)
+	diskCache.clearCache(path, "countIndex")
+	diskCache.clearCache(path, "counts")
+	# The array is written first, so an index entry always has its sidecar next to it
+	if diskCache.writeArray(countEntry, matrix['counts']):
+		sidecarFree = dict(matrix)
+		del sidecarFree['counts']
+		diskCache.writeCache(indexEntry, sidecarFree)
+	return matrix
+
+# Removes the cached index and sidecar of a count file
+def clearCountCache(path):
+	return diskCache.clearCache(path, "countIndex") + diskCache.clearCache(path, "counts")
@@ -0,0 +1,140 @@
+# Count matrices of several organisms in one store keyed by (organism, locus)
+	# Every organism's genes x timepoints block is stacked into a single (all genes) x timepoints array, organism i owning
+		# the rows offsets[i]:offsets[i+1], so an organism's counts, a range of organisms or a timepoint across all of them are views
+	# Each organism keeps its own locus -> row hash index, so the same locus ID in two count files never overwrites the other
+		# and a (organism, locus) lookup is one dictionary access
+	# Only the timepoints every organism has are stacked, named as in analysis.timepointLabels
+
+import numpy as np
+from .profiling import nullProfiler
+from .keggIndex import loadHierarchy
+from .countFiles import loadCountFile
+from .analysis import organismName, timepointLabels
+
+countReportColumns = ['issue', 'organism', 'locus', 'detail']
+
+class CountStore(object):
+	# organisms are names, matrices the countFiles.loadCountFile dictionaries of the same organisms
+	def __init__(self, organisms, matrices):
+		if len(set(organisms)) < len(organisms):
+			raise ValueError("Organism names must be unique, got "+", ".join(organisms))
+		self.organisms = list(organisms)
+		self._organismRows = dict((self.organisms[i], i) for i in range(len(self.organisms)))
+		self.timepoints = min(len(matrix['columns']) for matrix in matrices) if matrices else 0
+		self.timepointLabels = timepointLabels(matrices, self.timepoints)
+		self.offsets = np.zeros(len(matrices) + 1, dtype=np.int64)
+		self.offsets[1:] = np.cumsum([len(matrix['loci']) for matrix in matrices])
+		self.counts = np.empty((self.offsets[-1], self.timepoints))
+		for i in range(len(matrices)):
+			self.counts[self.offsets[i]:self.offsets[i + 1]] = np.asarray(matrices[i]['counts'])[:, :self.timepoints]
+		self.loci = [list(matrix['loci']) for matrix in matrices]
+		# A locus repeated within one file points at its last row, as in the count file index
+		self.indexes = [matrix['index'] if 'index' in matrix else dict((loci[row], row) for row in range(len(loci)))
+						for matrix, loci in zip(matrices, self.loci)]
+
+	def __len__(self):
+		return len(self.organisms)
+
+	def __contains__(self, key):
+		organism, locus = key
+		return organism in self._organismRows and locus in self.indexes[self._organismRows[organism]]
+
+	# Row of a (organism, locus) pair in the stacked counts, -1 when the organism's count file does not list the locus
+	def row(self, organism, locus):
+		i = self._organismRows[organism]
+		row = self.indexes[i].get(locus)
+		return -1 if row is None else int(self.offsets[i]) + row
+
+	# Counts of one (organism, locus) pair for every timepoint, a view of the stacked counts (KeyError when not listed)
+	def lookup(self, organism, locus):
+		row = self.row(organism, locus)
+		if row < 0:
+			raise KeyError((organism, locus))
+		return self.counts[row]
+
+	# Stacked rows of many loci of one organism, -1 for loci its count file does not list
+	def rows(self, organism, loci):
+		i = self._organismRows[organism]
+		index = self.indexes[i]
+		local = np.array([index.get(locus, -1) for locus in loci], dtype=np.int64)
+		return np.where(local >= 0, local + self.offsets[i], -1)
+
+	# genes x timepoints counts of one organism, or of every organism from organism to stop (included), as a view
+	def organismCounts(self, organism, stop=None):
+		start = self._organismRows[organism]
+		stop = start + 1 if stop is None else self._organismRows[stop] + 1
+		return self.counts[self.offsets[start]:self.offsets[stop]]
+
+	# One timepoint of every organism's genes, as a view, organism i at offsets[i]:offsets[i+1]
+	def timepointCounts(self, timepoint):
+		return self.counts[:, timepoint]
+
+	# Loci listed by the count files of several organisms, {locus: [organisms]} in store order
+	def collisions(self):
+		if not self.loci:
+			return {}
+		loci = np.concatenate([np.array(list(index), dtype=str) for index in self.indexes])
+		owners = np.repeat(np.arange(len(self.organisms)), [len(index) for index in self.indexes])
+		order = np.argsort(loci, kind='stable')
+		sortedLoci = loci[order]
+		starts = np.flatnonzero(np.concatenate([[True], sortedLoci[1:] != sortedLoci[:-1]]))
+		sizes = np.diff(np.append(starts, len(sortedLoci)))
+		shared = {}
+		for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+			shared[str(sortedLoci[start])] = [self.organisms[owner] for owner in owners[order[start:start + size]]]
+		return shared
+
+	# Loci listed more than once in one organism's count file, {locus: rows} per organism, only the last row is looked up
+	def duplicates(self, organism):
+		i = self._organismRows[organism]
+		if len(self.indexes[i]) == len(self.loci[i]):
+			return {}
+		seen = {}
+		for locus in self.loci[i]:
+			seen[locus] = seen.get(locus, 0) + 1
+		return dict((locus, rows) for locus, rows in seen.items() if rows > 1)
+
+	# Loci of one organism's count file that its parsed KEGG map (keggIndex.compactHierarchy) does not list
+	def unmapped(self, organism, hierarchy):
+		loci = sorted(self.indexes[self._organismRows[organism]])
+		return [loci[i] for i in np.flatnonzero(hierarchy['loci'].lookup(loci) < 0)]
+
+	# Rows in countReportColumns order: collisions across organisms, loci repeated within a file and, given the organisms'
+		# parsed maps, loci missing from them
+	def report(self, hierarchies=None):
+		rows = []
+		for locus, organisms in sorted(self.collisions().items()):
+			for organism in organisms:
+				rows.append(('collision', organism, locus, ",".join(other for other in organisms if other != organism)))
+		for organism in self.organisms:
+			for locus, count in sorted(self.duplicates(organism).items()):
+				rows.append(('duplicate', organism, locus, str(count)+" rows"))
+		if hierarchies is not None:
+			for organism, hierarchy in zip(self.organisms, hierarchies):
+				for locus in self.unmapped(organism, hierarchy):
+					rows.append(('unmapped', organism, locus, ""))
+		return rows
+
+# Organism names of fileList rows, a name listed by several rows (one map with several count files) is numbered from its
+	# second row on (ebr, ebr#2, ...) so every row keeps its own count file in the store
+def rowOrganisms(jsonFileList):
+	seen = {}
+	names = []
+	for jsonFile in jsonFileList:
+		name = organismName(jsonFile)
+		seen[name] = seen.get(name, 0) + 1
+		names.append(name if seen[name] == 1 else name+"#"+str(seen[name]))
+	return names
+
+# Store of a fileList's count files, organisms named after their KEGG map (see rowOrganisms), with their parsed maps for
+	# CountStore.report. Loci shared by two rows of the same organism are reported as collisions like any other
+def loadCountStore(jsonFileList, countFileList, useCache=True, profiler=nullProfiler):
+	matrices = []
+	hierarchies = []
+	for jsonFile, countFile in zip(jsonFileList, countFileList):
+		with profiler.stage("loadCounts", organismName(jsonFile)):
+			matrices.append(loadCountFile(countFile, useCache=useCache))
+		with profiler.stage("loadMap", organismName(jsonFile)):
+			hierarchies.append(loadHierarchy(jsonFile, useCache=useCache))
+	with profiler.stage("countStore"):
+		return CountStore(rowOrganisms(jsonFileList), matrices), hierarchies
@@ -0,0 +1,94 @@
+# Persistent on-disk cache for parsed input files
+	# Entries live in a .cache directory next to the source file and are named after the source file,
+		# its content hash and the version of the code that produced them, so edited inputs or parsers never reuse stale results
+
+import hashlib
+import os
+import pickle
+
+cacheDirName = ".cache"
+
+# SHA-1 of the file contents, read in blocks so large files are not held in memory
+def fileDigest(path, blockSize=1 << 20):
+	digest = hashlib.sha1()
+	with open(path, 'rb') as f:
+		block = f.read(blockSize)
+		while block:
+			digest.update(block)
+			block = f.read(blockSize)
+	return digest.hexdigest()
+
+def cacheDir(source):
+	return os.path.join(os.path.dirname(os.path.abspath(source)), cacheDirName)
+
+# Location of a cache entry, e.g. 02.Ecoli/.cache/ebr00001.json.hierarchy.<sha1>.v1.pickle
+	# kind separates the different products cached for the same source file
+def cachePath(source, kind, key, version, extension="pickle"):
+	fileName = os.path.basename(source)+"."+kind+"."+str(key)+".v"+str(version)+"."+extension
+	return os.path.join(cacheDir(source), fileName)
+
+# Returns the cached object, or None if there is no usable entry
+def readCache(path):
+	try:
+		with open(path, 'rb') as f:
+			return pickle.load(f)
+	except (IOError, OSError, EOFError, pickle.UnpicklingError):
+		return None
+
+# Writes through a temporary file so an interrupted run never leaves a truncated entry behind
+def writeCache(path, obj):
+	directory = os.path.dirname(path)
+	try:
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+		temporary = path+".tmp"+str(os.getpid())
+		with open(temporary, 'wb') as f:
+			pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+		os.rename(temporary, path)
+	except (IOError, OSError):
+		# A read-only data directory only costs the speedup
+		return False
+	return True
+
+# Removes the cache entries of one kind of a source file, returns the number of entries removed
+	# Entries are matched on the whole <source file name>.<kind>. prefix of cachePath, so the entries of other files sharing
+		# the directory (foo.txt.bak next to foo.txt) are never removed
+def clearCache(source, kind):
+	directory = cacheDir(source)
+	if not os.path.isdir(directory):
+		return 0
+	prefix = os.path.basename(source)+"."+kind+"."
+	removed = 0
+	for fileName in os.listdir(directory):
+		path = os.path.join(directory, fileName)
+		if fileName.startswith(prefix):
+			os.remove(path)
+			removed += 1
+	return removed
+
+# Loads a cached NumPy array memory-mapped (read-only), or None if there is no usable entry
+def readArray(path, mmap=True):
+	import numpy as np
+	try:
+		return np.load(path, mmap_mode='r' if mmap else None, allow_pickle=False)
+	except (IOError, OSError, ValueError):
+		return None
+
+def writeArray(path, array):
+	import numpy as np
+	directory = os.path.dirname(path)
+	try:
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+		temporary = path+".tmp"+str(os.getpid())
+		with open(temporary, 'wb') as f:
+			np.save(f, array, allow_pickle=False)
+		os.rename(temporary, path)
+	except (IOError, OSError):
+		return False
+	return True
+
+# Cheap key for files that are too large to hash on every run: size and modification time
+def fileStamp(path):
+	status = os.stat(path)
+	return str(status.st_size)+"-"+str(int(status.st_mtime * 1000000))
@@ -0,0 +1,68 @@
+# Long format export of combined distributions, one row per level, label, timepoint and organism
+	# Rows hold the same values as the charts: every timepoint's level x organism arrays (analysis.combinedArrays),
+		# with empty categories dropped from relative distributions as networkGraphing.py does before graphing (aggregation.prunedLevel)
+	# TSV is written with the csv module, Parquet through pandas (pyarrow or fastparquet is required), matplotlib is never imported
+
+import csv
+import importlib.util
+from .profiling import nullProfiler
+from .analysis import combinedArrays
+from .aggregation import prunedLevel
+
+exportColumns = ['level', 'label', 'timepoint', 'timepointIndex', 'organism', 'metric', 'value']
+exportFormats = ['tsv', 'parquet']
+
+# Yields one tuple per value in exportColumns order, labels sorted within each level as in the charts
+	# Line breaks used to wrap network labels in the charts become spaces
+	# metrics lists the metrics to write, all those of the distribution by default
+	# top and rankBy keep only the top categories of every level and timepoint, as for the charts
+def distributionRows(distribution, clean=None, metrics=None, profiler=nullProfiler, top=None, rankBy='share'):
+	if clean is None:
+		clean = distribution['method'] != 'traversal'
+	for metric in (distribution['metrics'] if metrics is None else metrics):
+		for timepoint in range(distribution['timepoints']):
+			levelList = combinedArrays(distribution, timepoint, metric, profiler)
+			for level in range(len(levelList)):
+				labels, values = prunedLevel(levelList[level][0], levelList[level][1], top, rankBy, clean)
+				for i in range(len(labels)):
+					for organism, value in zip(distribution['organisms'], values[i].tolist()):
+						yield (distribution['levels'][level], labels[i].replace("\n", " "), distribution['timepointLabels'][timepoint], timepoint+1, organism, metric, value)
+
+# Parquet for .parquet/.pq paths, TSV otherwise
+def exportFormat(path):
+	if path.endswith(".parquet") or path.endswith(".pq"):
+		return 'parquet'
+	return 'tsv'
+
+# True when pandas can write Parquet here, checked without importing pandas or an engine
+def parquetAvailable():
+	if importlib.util.find_spec('pandas') is None:
+		return False
+	return any(importlib.util.find_spec(engine) is not None for engine in ['pyarrow', 'fastparquet'])
+
+# Writes rows to path, returns the number of rows written
+	# Parquet without an engine fails before any row is computed
+def writeTable(rows, path, format=None, columns=exportColumns):
+	if format is None:
+		format = exportFormat(path)
+	if format == 'parquet':
+		if not parquetAvailable():
+			raise ValueError("Parquet export requires pyarrow or fastparquet")
+		import pandas as pd
+		table = pd.DataFrame.from_records(list(rows), columns=columns)
+		table.to_parquet(path, index=False, compression='snappy')
+		return len(table)
+	if format != 'tsv':
+		raise ValueError("Unknown export format "+str(format)+", expected one of "+", ".join(exportFormats))
+	count = 0
+	with open(path, "w", newline="") as f:
+		writer = csv.writer(f, delimiter="\t", lineterminator="\n")
+		writer.writerow(columns)
+		for row in rows:
+			writer.writerow(row)
+			count += 1
+	return count
+
+def exportDistribution(distribution, path, format=None, clean=None, metrics=None, profiler=nullProfiler, top=None, rankBy='share'):
+	with profiler.stage("export"):
+		return writeTable(distributionRows(distribution, clean, metrics, profiler, top, rankBy), path, format)
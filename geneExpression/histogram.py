@@ -0,0 +1,188 @@
+# Count histograms per timepoint, the values above a quantile cutoff of each timepoint are left out
+	# Three modes:
+		# sequential: pandas, each timepoint is filtered in turn on the rows left by the previous ones (original behaviour)
+		# vectorized: all cutoffs in one NumPy pass over the whole matrix, one combined mask and bin counts without copying the data
+		# streaming: as vectorized over chunked reads, cutoffs come from a bounded-memory sample so any file size fits in memory
+	# pandas and matplotlib are imported only when a file is read in sequential mode or plotted
+
+import itertools
+import math
+import numpy as np
+
+histogramColumns = ["locus", "ELP", "MLP", "LLP", "LSP", "SP"]
+histogramModes = ["sequential", "vectorized", "streaming"]
+
+# Reads a list of count files, one path per line, titled after the first directory of the path
+def readHistogramList(path):
+	fileList = []
+	with open(path) as f:
+		for line in f:
+			line = line.rstrip()
+			title = line.split("/")
+			fileList.append((title[1], line))
+	return fileList
+
+def readCounts(path):
+	import pandas as pd
+	return pd.read_table(path, names=histogramColumns)
+
+# Keeps the loci below the cutoff quantile at every timepoint
+def filterQuantiles(df, cutoff=0.9):
+	for column in histogramColumns[1:]:
+		df = df[df[column] < df[column].quantile(cutoff)]
+	return df[histogramColumns]
+
+def plotHistogram(df, title, bins=100):
+	from matplotlib import pyplot as plt
+	df.hist(bins=bins)
+	plt.subplots_adjust(hspace=0.5)
+	plt.suptitle(title)
+	plt.show()
+
+# Parses tab separated lines into a (lines x timepoints) float array of the columns after the locus
+	# Any annotation columns after the counts are ignored, a first line that is not numeric is taken as a header
+def _countRows(lines, header):
+	columnCount = len(histogramColumns) - 1
+	return np.loadtxt(lines, delimiter="\t", usecols=range(1, columnCount + 1), skiprows=1 if header else 0, ndmin=2, dtype=np.float64)
+
+def _isHeader(line):
+	try:
+		float(line.split("\t")[1])
+		return False
+	except (ValueError, IndexError):
+		return True
+
+# Yields the count matrix of a file in blocks of at most chunkSize rows
+def iterCountChunks(path, chunkSize=100000):
+	with open(path) as f:
+		first = True
+		while True:
+			lines = [line for line in itertools.islice(f, chunkSize) if line.strip()]
+			if not lines:
+				if first:
+					yield np.empty((0, len(histogramColumns) - 1))
+				return
+			header = first and _isHeader(lines[0])
+			first = False
+			yield _countRows(lines, header)
+
+def readCountArray(path):
+	return np.concatenate(list(iterCountChunks(path, chunkSize=1 << 62)))
+
+# Cutoff of every timepoint in one pass, pandas' linear interpolation and NaN handling
+def quantileCutoffs(values, cutoff=0.9):
+	return np.nanquantile(values, cutoff, axis=0)
+
+# True for loci below the cutoff at every timepoint
+def combinedMask(values, cutoffs):
+	return (values < cutoffs).all(axis=1)
+
+# Range of the rows kept by mask, per timepoint
+def maskedRange(values, mask):
+	lower = np.min(values, axis=0, where=mask[:, None], initial=np.inf)
+	upper = np.max(values, axis=0, where=mask[:, None], initial=-np.inf)
+	return lower, upper
+
+# Equal width bin edges over a range as DataFrame.hist draws them, empty or single valued ranges are widened like NumPy does
+def binEdges(lower, upper, bins=100):
+	edges = []
+	for low, high in zip(lower, upper):
+		if not np.isfinite(low):
+			low, high = 0.0, 1.0
+		elif low == high:
+			low, high = low - 0.5, high + 0.5
+		edges.append(np.linspace(low, high, bins + 1))
+	return edges
+
+# Bin counts of the rows kept by mask, every timepoint column is histogrammed in place with mask as its weights
+def binCounts(values, mask, edges):
+	weights = mask.astype(np.float64)
+	return [np.histogram(values[:, i], bins=edges[i], weights=weights)[0].astype(np.int64) for i in range(values.shape[1])]
+
+# Bottom-k sample of the rows seen so far: every row gets a random key and the size rows with the smallest keys are kept,
+	# which is a uniform sample of the stream in bounded memory. Quantiles are exact while no more than size rows were seen,
+		# afterwards their rank error is about sqrt(q * (1 - q) / size)
+class QuantileSketch(object):
+	def __init__(self, size=100000, seed=0):
+		self.size = size
+		self.count = 0
+		self.keys = np.empty(0)
+		self.rows = None
+		self._random = np.random.RandomState(seed)
+
+	def update(self, values):
+		self.count += len(values)
+		keys = np.concatenate([self.keys, self._random.random_sample(len(values))])
+		rows = values if self.rows is None else np.concatenate([self.rows, values])
+		if len(keys) > self.size:
+			keep = np.argpartition(keys, self.size)[:self.size]
+			keys = keys[keep]
+			rows = rows[keep]
+		self.keys = keys
+		self.rows = rows
+
+	def quantile(self, cutoff):
+		return quantileCutoffs(self.rows, cutoff)
+
+# One file in memory: cutoffs, combined mask and bin counts, returns {'columns', 'cutoffs', 'kept', 'total', 'counts', 'edges'}
+def vectorizedHistogram(values, cutoff=0.9, bins=100):
+	cutoffs = quantileCutoffs(values, cutoff)
+	mask = combinedMask(values, cutoffs)
+	lower, upper = maskedRange(values, mask)
+	edges = binEdges(lower, upper, bins)
+	return {'columns': histogramColumns[1:], 'cutoffs': cutoffs, 'kept': int(mask.sum()), 'total': len(values),
+			'counts': binCounts(values, mask, edges), 'edges': edges}
+
+# One file in chunks: a sampling pass for the cutoffs, one for the range of the kept rows and one for the bin counts
+	# Memory stays bounded by chunkSize and sketchSize rows whatever the file size
+def streamingHistogram(path, cutoff=0.9, bins=100, chunkSize=100000, sketchSize=100000, seed=0):
+	sketch = QuantileSketch(sketchSize, seed)
+	for values in iterCountChunks(path, chunkSize):
+		sketch.update(values)
+	cutoffs = sketch.quantile(cutoff)
+	lower = np.full(len(cutoffs), np.inf)
+	upper = np.full(len(cutoffs), -np.inf)
+	kept = 0
+	for values in iterCountChunks(path, chunkSize):
+		mask = combinedMask(values, cutoffs)
+		kept += int(mask.sum())
+		chunkLower, chunkUpper = maskedRange(values, mask)
+		lower = np.minimum(lower, chunkLower)
+		upper = np.maximum(upper, chunkUpper)
+	edges = binEdges(lower, upper, bins)
+	counts = [np.zeros(bins, dtype=np.int64) for edge in edges]
+	for values in iterCountChunks(path, chunkSize):
+		chunkCounts = binCounts(values, combinedMask(values, cutoffs), edges)
+		for i in range(len(counts)):
+			counts[i] += chunkCounts[i]
+	return {'columns': histogramColumns[1:], 'cutoffs': cutoffs, 'kept': kept, 'total': sketch.count,
+			'counts': counts, 'edges': edges, 'exact': sketch.count <= sketchSize}
+
+# Draws precomputed bin counts in the grid DataFrame.hist uses, one panel per timepoint
+	# Shown on screen, or saved to save on the non-interactive backend when given
+def plotBinnedHistogram(histogram, title, save=None):
+	if save is None:
+		from matplotlib import pyplot as plt
+	else:
+		from .rendering import _pyplot
+		plt = _pyplot()
+	columns = histogram['columns']
+	ncols = int(math.ceil(math.sqrt(len(columns))))
+	nrows = int(math.ceil(len(columns) / float(ncols)))
+	fig, axes = plt.subplots(nrows, ncols, squeeze=False)
+	for i in range(nrows * ncols):
+		ax = axes[i // ncols][i % ncols]
+		if i >= len(columns):
+			ax.set_visible(False)
+			continue
+		edges = histogram['edges'][i]
+		ax.hist(edges[:-1], bins=edges, weights=histogram['counts'][i])
+		ax.set_title(columns[i])
+		ax.grid(True)
+	plt.subplots_adjust(hspace=0.5)
+	plt.suptitle(title)
+	if save is None:
+		plt.show()
+		return
+	fig.savefig(save)
+	plt.close(fig)
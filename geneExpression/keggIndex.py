@@ -0,0 +1,423 @@
+# Loading and indexing of KEGG pathway maps
+	# Each map is walked a single time into a compact model shared by both graphing scripts:
+		# every category name, cleaned label and locus ID is interned to an integer ID (LabelTable),
+		# category nodes are kept in map order as flat arrays of name, parent node and depth,
+		# and every leaf as its locus ID, the node listing it and its depth
+	# Organisms are placed in the model through their locus IDs, with array lookups instead of list scans:
+		# firstHitLinks (networkGraphing.py): the first listing of each locus is used, provided it is a gene under a pathway
+		# allHitLinks (networkGraphing_hardCode.py): every category is kept and genes count in every pathway listing them
+		# treeLinks: every listing at any depth, for rollups over the whole tree in depth first order
+
+import json
+import sys
+import numpy as np
+from . import diskCache
+
+# Top level categories removed from every map (redundant/uninformative)
+excludedCategories = ['09180 Brite Hierarchies']
+
+# This also performs minor text parsing to remove variance between datasets
+	# KEGG pathway maps add organism specific tags if genes are contained in a pathway, network, etc.
+		# This step removes those specific tags so organisms can be compared
+def labelClean(label, joinString):
+	uniqueID = str(label).split(" ", 1)
+	# Unique tags are contained within brackets, so a bracket test is performed
+	if uniqueID[1][-1] == "]":
+		cleanedLabel = label.split(" ")
+		cleanedLabel.pop()
+		cleanedLabel = joinString.join(cleanedLabel)
+	# If there is no specific tag, the labels are returned with required replacements
+	else:
+		cleanedLabel = uniqueID[1].replace(' ', joinString)
+	return str(cleanedLabel)
+
+# Labels as the manual traversal of networkGraphing_hardCode.py reads them: the ID is always removed along with any tag,
+	# network words are joined with newlines
+def traversalLabel(label, depth):
+	joinString = "\n" if depth == 1 else " "
+	cleanedLabel = str(str(label).split(" ", 1)[1]).replace(' ', joinString)
+	if cleanedLabel[-1] == "]":
+		cleanedLabel = cleanedLabel.split(joinString)
+		cleanedLabel.pop()
+		cleanedLabel = joinString.join(cleanedLabel)
+	return cleanedLabel
+
+# Opens a KEGG JSON map and drops the excluded top level categories
+def loadKeggMap(path, excluded=excludedCategories):
+	with open(path) as f:
+		data = json.load(f)
+	data['children'] = [category for category in data.get('children', []) if str(category['name']) not in excluded]
+	return data
+
+# Two way mapping between labels and consecutive integer IDs, each label string is stored once
+class LabelTable(object):
+	def __init__(self, labels=()):
+		self.labels = []
+		self.ids = {}
+		for label in labels:
+			self.intern(label)
+
+	def intern(self, label):
+		labelID = self.ids.get(label)
+		if labelID is None:
+			label = sys.intern(str(label))
+			labelID = len(self.labels)
+			self.ids[label] = labelID
+			self.labels.append(label)
+		return labelID
+
+	# IDs of a sequence of labels as an array, -1 for labels not in the table
+	def lookup(self, labels):
+		ids = self.ids
+		return np.array([ids.get(label, -1) for label in labels], dtype=np.int64)
+
+	def __len__(self):
+		return len(self.labels)
+
+	def __getitem__(self, labelID):
+		return self.labels[labelID]
+
+	def __contains__(self, label):
+		return label in self.ids
+
+	# Only the labels are pickled, the reverse mapping is rebuilt on load
+	def __getstate__(self):
+		return self.labels
+
+	def __setstate__(self, labels):
+		self.labels = []
+		self.ids = {}
+		for label in labels:
+			self.intern(label)
+
+# KO identifier of a gene leaf (e.g. K00845 in "ECB_02298 glk; glucokinase\tK00845 glk; glucokinase [EC:2.7.1.2]"), None without one
+def _koID(name):
+	for part in str(name).split("\t")[1:]:
+		fields = part.split(None, 1)
+		if fields and len(fields[0]) == 6 and fields[0][0] == 'K' and fields[0][1:].isdigit():
+			return fields[0]
+	return None
+
+# Applies a label function, names without a separate ID are kept whole instead of failing the whole map
+def _safeLabel(function, name, *args):
+	try:
+		return function(name, *args)
+	except IndexError:
+		return str(name)
+
+# Walks a KEGG map (root -> network -> subNetwork -> pathway -> gene) once into the compact model
+	# Nodes down to depth 3 are categories. Genes at depth 4 and categories without children are leaves,
+		# filed under the locus ID that starts their name (childless categories list their own ID, as both original searches did)
+	# Returns a dictionary of LabelTables and arrays:
+		# names, nodeName, nodeParent (-1 for networks), nodeDepth, nodeNetwork: category nodes in map order
+		# loci, leafLocus, leafNode, leafDepth: leaves in map order, leafNode is the pathway for genes and the node itself otherwise
+		# labels, firstHitLabel, allHitLabel: cleaned label ID of every node for the two scripts
+		# firstPathway: per locus ID, the pathway node of its first listing outside the excluded categories, -1 if that is not a gene
+		# treeName, treeLocus, treeParent, treeDepth, treeNetwork, treeEnd, treeLabel: every node at any depth in depth first order,
+			# categories with their name and label (treeLocus -1), leaves with their locus ID (treeName and treeLabel -1),
+			# treeEnd is the end of each node's subtree
+		# kos, locusKO: KO identifiers, and per locus ID the KO of its first listing (-1 without one)
+def compactHierarchy(tree, excluded=excludedCategories):
+	names = LabelTable()
+	loci = LabelTable()
+	nodeName = []
+	nodeParent = []
+	nodeDepth = []
+	nodeNetwork = []
+	leafLocus = []
+	leafNode = []
+	leafDepth = []
+	treeName = []
+	treeLocus = []
+	treeParent = []
+	treeDepth = []
+	treeNetwork = []
+	kos = LabelTable()
+	locusKO = []
+	# Explicit stack instead of recursion, children are pushed in reverse to preserve map order
+		# Every node at any depth also goes to the tree arrays in the same depth first order,
+			# nodes below the genes (parent None) only go there
+	stack = [(child, -1, 1, -1) for child in reversed(tree.get('children', []))]
+	while stack:
+		node, parent, depth, treeIndex = stack.pop()
+		children = node.get('children')
+		fields = str(node.get('name', '')).split(None, 1)
+		treeNode = len(treeDepth)
+		treeParent.append(treeIndex)
+		treeDepth.append(depth)
+		treeNetwork.append(treeNode if treeIndex < 0 else treeNetwork[treeIndex])
+		treeName.append(names.intern(node.get('name', '')) if children is not None else -1)
+		treeLocus.append(loci.intern(fields[0]) if children is None and fields else -1)
+		# A locus gets the KO of its first listing, loci are interned in order so a new one is the next locusKO entry
+		if children is None and fields and treeLocus[-1] == len(locusKO):
+			ko = _koID(node.get('name', ''))
+			locusKO.append(-1 if ko is None else kos.intern(ko))
+		if depth >= 4 and children is not None:
+			for child in reversed(children):
+				stack.append((child, None, depth + 1, treeNode))
+		if parent is None:
+			continue
+		if depth <= 3:
+			index = len(nodeName)
+			nodeName.append(names.intern(node.get('name', '')))
+			nodeParent.append(parent)
+			nodeDepth.append(depth)
+			nodeNetwork.append(index if parent < 0 else nodeNetwork[parent])
+			if children is not None:
+				for child in reversed(children):
+					stack.append((child, index, depth + 1, treeNode))
+				continue
+			parent = index
+		if fields:
+			leafLocus.append(loci.intern(fields[0]))
+			leafNode.append(parent)
+			leafDepth.append(depth)
+
+	labels = LabelTable()
+	firstHitLabel = np.array([labels.intern(_safeLabel(labelClean, names[nodeName[i]], "\n" if nodeDepth[i] == 1 else " "))
+							for i in range(len(nodeName))], dtype=np.int64)
+	allHitLabel = np.array([labels.intern(_safeLabel(traversalLabel, names[nodeName[i]], nodeDepth[i]))
+							for i in range(len(nodeName))], dtype=np.int64)
+
+	# End (exclusive) of every node's subtree in the tree arrays, so the subtree of node i is i:treeEnd[i]
+	treeEnd = list(range(1, len(treeDepth) + 1))
+	for node in range(len(treeDepth) - 1, -1, -1):
+		if treeParent[node] >= 0 and treeEnd[node] > treeEnd[treeParent[node]]:
+			treeEnd[treeParent[node]] = treeEnd[node]
+	treeLabel = np.array([labels.intern(_safeLabel(traversalLabel, names[treeName[i]], treeDepth[i])) if treeName[i] >= 0 else -1
+							for i in range(len(treeName))], dtype=np.int64)
+
+	hierarchy = {'name': tree.get('name'), 'names': names, 'loci': loci,
+				'nodeName': np.array(nodeName, dtype=np.int64), 'nodeParent': np.array(nodeParent, dtype=np.int64),
+				'nodeDepth': np.array(nodeDepth, dtype=np.int8), 'nodeNetwork': np.array(nodeNetwork, dtype=np.int64),
+				'leafLocus': np.array(leafLocus, dtype=np.int64), 'leafNode': np.array(leafNode, dtype=np.int64),
+				'leafDepth': np.array(leafDepth, dtype=np.int8),
+				'labels': labels, 'firstHitLabel': firstHitLabel, 'allHitLabel': allHitLabel,
+				'treeName': np.array(treeName, dtype=np.int64), 'treeLocus': np.array(treeLocus, dtype=np.int64),
+				'treeParent': np.array(treeParent, dtype=np.int64), 'treeDepth': np.array(treeDepth, dtype=np.int16),
+				'treeNetwork': np.array(treeNetwork, dtype=np.int64), 'treeEnd': np.array(treeEnd, dtype=np.int64), 'treeLabel': treeLabel}
+
+	# The first listing of each locus outside the excluded categories is only accepted if it is a gene under a pathway
+	excludedNode = np.array([names[name] in excluded for name in nodeName], dtype=bool)
+	included = np.flatnonzero(~excludedNode[hierarchy['nodeNetwork'][hierarchy['leafNode']]]) if len(leafNode) else np.zeros(0, dtype=np.int64)
+	firstLocus, firstPosition = np.unique(hierarchy['leafLocus'][included], return_index=True)
+	firstLeaf = included[firstPosition]
+	firstPathway = np.full(len(loci), -1, dtype=np.int64)
+	accepted = hierarchy['leafDepth'][firstLeaf] == 4
+	firstPathway[firstLocus[accepted]] = hierarchy['leafNode'][firstLeaf[accepted]]
+	hierarchy['firstPathway'] = firstPathway
+	hierarchy['kos'] = kos
+	hierarchy['locusKO'] = np.array(locusKO, dtype=np.int64)
+	return hierarchy
+
+# Rows of a count matrix for every locus ID in locusIDs, as (row, position in locusIDs) pairs
+	# A locus listed on several rows of the count file is placed on all of them
+def _rowsOfLoci(rowLocus, locusIDs):
+	order = np.argsort(rowLocus, kind='stable')
+	sortedLocus = rowLocus[order]
+	left = np.searchsorted(sortedLocus, locusIDs, 'left')
+	right = np.searchsorted(sortedLocus, locusIDs, 'right')
+	repeats = right - left
+	positions = np.repeat(np.arange(len(locusIDs)), repeats)
+	offsets = np.arange(len(positions)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+	return order[np.repeat(left, repeats) + offsets], positions
+
+# Turns (network, subNetwork, pathway) label ID triplets into the category links the merge works with
+	# Track dictionaries hold each child once, in order of first appearance, pathwayLabels lists pathways in the same order
+def _trackDicts(labels, triplets):
+	networkTrackDict = {}
+	subNetworkTrackDict = {}
+	pathwayLabels = []
+	seen = set()
+	for network, subNetwork, pathway in triplets:
+		networkLabel, subNetworkLabel, pathwayLabel = labels[network], labels[subNetwork], labels[pathway]
+		if networkLabel not in networkTrackDict:
+			networkTrackDict[networkLabel] = []
+		if (1, networkLabel, subNetworkLabel) not in seen:
+			seen.add((1, networkLabel, subNetworkLabel))
+			networkTrackDict[networkLabel].append(subNetworkLabel)
+		if subNetworkLabel not in subNetworkTrackDict:
+			subNetworkTrackDict[subNetworkLabel] = []
+		if (2, subNetworkLabel, pathwayLabel) not in seen:
+			seen.add((2, subNetworkLabel, pathwayLabel))
+			subNetworkTrackDict[subNetworkLabel].append(pathwayLabel)
+		if (3, pathwayLabel) not in seen:
+			seen.add((3, pathwayLabel))
+			pathwayLabels.append(pathwayLabel)
+	return networkTrackDict, subNetworkTrackDict, pathwayLabels
+
+# Column of every pathway label ID in pathwayLabels, -1 for the others
+def _pathwayColumns(labels, pathwayLabels):
+	columns = np.full(len(labels), -1, dtype=np.int64)
+	for column in range(len(pathwayLabels)):
+		columns[labels.ids[pathwayLabels[column]]] = column
+	return columns
+
+def _links(networkTrackDict, subNetworkTrackDict, pathwayLabels, geneRows, pathwayColumns, weights):
+	return {'networkTrackDict': networkTrackDict, 'subNetworkTrackDict': subNetworkTrackDict, 'pathwayLabels': pathwayLabels,
+			'geneRows': geneRows, 'pathwayColumns': pathwayColumns, 'weights': weights}
+
+# Attribution policies: how a gene listed under several pathways is counted
+	# first: only in the pathway of its first listing, full: once in every pathway listing it,
+	# fractional: split evenly between the pathways listing it, so every gene still adds up to its count once
+attributionPolicies = ['first', 'full', 'fractional']
+
+# Sparse gene x pathway weights of the (geneRows[i], pathwayColumns[i]) listings of an attribution policy
+	# listingOrder orders the listings of a gene (map order), a gene is linked to each pathway once
+	# Returns geneRows, pathwayColumns and weights ordered by gene row and listing order
+def attributionWeights(geneRows, pathwayColumns, listingOrder, attribution='full'):
+	if attribution not in attributionPolicies:
+		raise ValueError("Unknown attribution "+str(attribution)+", expected one of "+", ".join(attributionPolicies))
+	order = np.lexsort((listingOrder, geneRows))
+	geneRows = geneRows[order]
+	pathwayColumns = pathwayColumns[order]
+	keep = np.ones(len(geneRows), dtype=bool)
+	if attribution == 'first':
+		keep[1:] = geneRows[1:] != geneRows[:-1]
+	elif len(geneRows):
+		# First listing of every (gene, pathway) pair
+		pairs = np.unique(np.stack([geneRows, pathwayColumns], axis=1), axis=0, return_index=True)[1]
+		keep[:] = False
+		keep[pairs] = True
+	geneRows = geneRows[keep]
+	pathwayColumns = pathwayColumns[keep]
+	weights = np.ones(len(geneRows))
+	if attribution == 'fractional' and len(geneRows):
+		weights /= np.bincount(geneRows)[geneRows]
+	return geneRows, pathwayColumns, weights
+
+# True for every leaf listed under one of the excluded top level categories
+def _excludedLeaves(hierarchy):
+	excludedNode = np.array([hierarchy['names'][name] in excludedCategories for name in hierarchy['nodeName']], dtype=bool)
+	return excludedNode[hierarchy['nodeNetwork'][hierarchy['leafNode']]]
+
+# networkGraphing.py: places every count file locus through the first listing of its locus ID
+	# Categories appear in the order their first gene appears in the count file
+	# Returns the track dictionaries, pathwayLabels and the (geneRows, pathwayColumns) membership of every placed gene with its weights
+	# With the full or fractional attribution every gene listing outside the excluded categories is used instead of the first one
+def firstHitLinks(hierarchy, loci, attribution='first'):
+	rowLocus = hierarchy['loci'].lookup(loci)
+	if attribution == 'first':
+		pathwayNode = np.full(len(rowLocus), -1, dtype=np.int64)
+		listed = rowLocus >= 0
+		pathwayNode[listed] = hierarchy['firstPathway'][rowLocus[listed]]
+		# Checks to see if a hit is found. Hits will always be of full length (network, subNetwork, pathway)
+		geneRows = np.flatnonzero(pathwayNode >= 0)
+		pathways = pathwayNode[geneRows]
+		weights = np.ones(len(geneRows))
+	else:
+		leaves = np.flatnonzero((hierarchy['leafDepth'] == 4) & ~_excludedLeaves(hierarchy))
+		geneRows, positions = _rowsOfLoci(rowLocus, hierarchy['leafLocus'][leaves])
+		# Listings in count file order, then map order
+		order = np.lexsort((leaves[positions], geneRows))
+		geneRows = geneRows[order]
+		pathways = hierarchy['leafNode'][leaves[positions[order]]]
+	subNetworks = hierarchy['nodeParent'][pathways]
+	label = hierarchy['firstHitLabel']
+	triplets = np.stack([label[hierarchy['nodeParent'][subNetworks]], label[subNetworks], label[pathways]], axis=1)
+	if len(triplets):
+		unique, first = np.unique(triplets, axis=0, return_index=True)
+		ordered = unique[np.argsort(first)].tolist()
+	else:
+		ordered = []
+	networkTrackDict, subNetworkTrackDict, pathwayLabels = _trackDicts(hierarchy['labels'], ordered)
+	pathwayColumns = _pathwayColumns(hierarchy['labels'], pathwayLabels)[triplets[:, 2]]
+	if attribution != 'first':
+		# Pathway nodes sharing a label are one column
+		geneRows, pathwayColumns, weights = attributionWeights(geneRows, pathwayColumns, np.arange(len(geneRows)), attribution)
+	return _links(networkTrackDict, subNetworkTrackDict, pathwayLabels, geneRows, pathwayColumns, weights)
+
+# Track dictionaries of the whole map as the manual traversal builds them: every network, subNetwork and pathway in map order,
+	# each child listed once under its parent whether or not it holds genes
+def _mapTrackDicts(hierarchy):
+	label = hierarchy['allHitLabel']
+	labels = hierarchy['labels']
+	nodeDepth = hierarchy['nodeDepth'].tolist()
+	nodeParent = hierarchy['nodeParent'].tolist()
+	networkTrackDict = {}
+	subNetworkTrackDict = {}
+	pathwayLabels = []
+	seen = set()
+	for node in range(len(nodeDepth)):
+		nodeLabel = labels[label[node]]
+		if nodeDepth[node] == 1:
+			if nodeLabel not in networkTrackDict:
+				networkTrackDict[nodeLabel] = []
+			continue
+		parentLabel = labels[label[nodeParent[node]]]
+		parentDict = networkTrackDict if nodeDepth[node] == 2 else subNetworkTrackDict
+		if (nodeDepth[node], parentLabel, nodeLabel) not in seen:
+			seen.add((nodeDepth[node], parentLabel, nodeLabel))
+			parentDict[parentLabel].append(nodeLabel)
+		if nodeDepth[node] == 2:
+			if nodeLabel not in subNetworkTrackDict:
+				subNetworkTrackDict[nodeLabel] = []
+		elif (3, nodeLabel) not in seen:
+			seen.add((3, nodeLabel))
+			pathwayLabels.append(nodeLabel)
+	return networkTrackDict, subNetworkTrackDict, pathwayLabels
+
+# networkGraphing_hardCode.py: every category of the map is listed, and a count file locus is linked to every pathway listing it
+	# (genes under pathways, and childless pathways listing their own ID)
+	# The first attribution keeps only the first listing of each gene, fractional splits it between its pathways
+		# Both only use listings outside the excluded categories, which the merge drops, so each gene still adds its count once
+def allHitLinks(hierarchy, loci, attribution='full'):
+	networkTrackDict, subNetworkTrackDict, pathwayLabels = _mapTrackDicts(hierarchy)
+	rowLocus = hierarchy['loci'].lookup(loci)
+	# Locus IDs of the organism as a boolean mask over every locus of the map
+	present = np.zeros(len(hierarchy['loci']), dtype=bool)
+	present[rowLocus[rowLocus >= 0]] = True
+	leafNode = hierarchy['leafNode']
+	placed = present[hierarchy['leafLocus']] & (hierarchy['nodeDepth'][leafNode] == 3) & (hierarchy['leafDepth'] >= 3)
+	if attribution != 'full':
+		placed &= ~_excludedLeaves(hierarchy)
+	leaves = np.flatnonzero(placed)
+	geneRows, positions = _rowsOfLoci(rowLocus, hierarchy['leafLocus'][leaves])
+	pathwayColumns = _pathwayColumns(hierarchy['labels'], pathwayLabels)[hierarchy['allHitLabel'][leafNode[leaves[positions]]]]
+	# A locus listed more than once under the same pathway label is linked to it once
+	geneRows, pathwayColumns, weights = attributionWeights(geneRows, pathwayColumns, leaves[positions], attribution)
+	return _links(networkTrackDict, subNetworkTrackDict, pathwayLabels, geneRows, pathwayColumns, weights)
+
+# Every node of the tree arrays a count file locus is listed as, at any depth, as (geneRows, treeNodes) pairs
+	# Leaves under the excluded top level categories are left out
+def treeLinks(hierarchy, loci, excluded=()):
+	rowLocus = hierarchy['loci'].lookup(loci)
+	present = np.zeros(len(hierarchy['loci']), dtype=bool)
+	present[rowLocus[rowLocus >= 0]] = True
+	treeLocus = hierarchy['treeLocus']
+	leaves = np.flatnonzero(treeLocus >= 0)
+	leaves = leaves[present[treeLocus[leaves]]]
+	if excluded:
+		networkNames = hierarchy['treeName'][hierarchy['treeNetwork'][leaves]]
+		leaves = leaves[[name < 0 or hierarchy['names'][name] not in excluded for name in networkNames]]
+	geneRows, positions = _rowsOfLoci(rowLocus, treeLocus[leaves])
+	return geneRows, leaves[positions]
+
+# KO ID (hierarchy['kos']) of every count file locus, -1 for loci that are not listed or have no KO
+def locusKOs(hierarchy, loci):
+	rowLocus = hierarchy['loci'].lookup(loci)
+	rowKO = np.full(len(rowLocus), -1, dtype=np.int64)
+	rowKO[rowLocus >= 0] = hierarchy['locusKO'][rowLocus[rowLocus >= 0]]
+	return rowKO
+
+# Parses a KEGG map into its compact model
+def parseHierarchy(path):
+	with open(path) as f:
+		tree = json.load(f)
+	return compactHierarchy(tree)
+
+# Bumped whenever parseHierarchy/labelClean change what they produce, which invalidates existing cache entries
+parserVersion = 4
+
+# Loads a parsed KEGG map, going through the on-disk cache unless useCache is False
+	# Entries are keyed by the SHA-1 of the JSON file and parserVersion, stale entries for the same file are replaced
+def loadHierarchy(path, useCache=True):
+	if not useCache:
+		return parseHierarchy(path)
+	entry = diskCache.cachePath(path, "hierarchy", diskCache.fileDigest(path), parserVersion)
+	hierarchy = diskCache.readCache(entry)
+	if hierarchy is None:
+		hierarchy = parseHierarchy(path)
+		diskCache.clearCache(path, "hierarchy")
+		diskCache.writeCache(entry, hierarchy)
+	return hierarchy
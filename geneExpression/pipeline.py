@@ -0,0 +1,270 @@
+# Per-organism pipeline: JSON parsing, locus mapping and aggregation to pathway totals
+	# Organisms are independent until the per-timepoint merge, so each one is reduced to its pathway totals and category links
+		# These can be produced in a process pool and are merged in fileList order, so results never depend on worker scheduling
+
+import hashlib
+import multiprocessing
+import os
+import numpy as np
+from .profiling import Profiler, nullProfiler
+from . import diskCache
+from .keggIndex import loadHierarchy, firstHitLinks, allHitLinks, treeLinks, locusKOs, excludedCategories, parserVersion
+from .countFiles import loadCountFile, countFileChunks, loaderVersion
+from .aggregation import geneBase, finishMetrics, metricColumns, sparseTotals, subtreeTotals, depthTotals
+
+# Adds up an organism's pathway totals one block of genes at a time, links come from keggIndex.firstHitLinks or allHitLinks
+	# Only the additive geneBase sums of the pathways seen so far are kept, so memory does not grow with the number of genes
+	# Category links are merged in block order, which lists them as the whole file in one block would
+class OrganismAccumulator(object):
+	def __init__(self):
+		self.networkTrackDict = {}
+		self.subNetworkTrackDict = {}
+		self._networkMembers = {}
+		self._subNetworkMembers = {}
+		self.pathwayLabels = []
+		self._pathwayRows = {}
+		self.columns = None
+		self.genes = 0
+		self.baseSums = None
+		self.readTotals = None
+		self.rateTotals = None
+
+	def add(self, matrix, links):
+		counts = np.asarray(matrix['counts'], dtype=np.float64)
+		lengths = matrix.get('lengths')
+		timepoints = len(matrix['columns'])
+		if self.columns is None:
+			self.columns = list(matrix['columns'])
+			self.baseSums = np.zeros((0, (2 if lengths is None else 3) * timepoints))
+			self.readTotals = np.zeros(timepoints)
+			if lengths is not None:
+				self.rateTotals = np.zeros(timepoints)
+		_mergeTrackDict(self.networkTrackDict, self._networkMembers, links['networkTrackDict'])
+		_mergeTrackDict(self.subNetworkTrackDict, self._subNetworkMembers, links['subNetworkTrackDict'])
+		for label in links['pathwayLabels']:
+			if label not in self._pathwayRows:
+				self._pathwayRows[label] = len(self.pathwayLabels)
+				self.pathwayLabels.append(label)
+		if len(self.pathwayLabels) > len(self.baseSums):
+			self.baseSums = np.vstack([self.baseSums, np.zeros((len(self.pathwayLabels) - len(self.baseSums), self.baseSums.shape[1]))])
+		base = geneBase(counts, lengths)
+		pathwayRows = np.array([self._pathwayRows[label] for label in links['pathwayLabels']], dtype=np.int64)
+		self.baseSums += sparseTotals(base, links['geneRows'], pathwayRows[links['pathwayColumns']], links['weights'], len(self.baseSums))
+		self.genes += len(matrix['loci'])
+		self.readTotals += counts.sum(axis=0)
+		if self.rateTotals is not None:
+			self.rateTotals += base[:, 2 * timepoints:].sum(axis=0)
+
+	# What the merge needs: category links, pathway labels and metricSums, the pathways x (metrics * timepoints) totals of every metric
+	def result(self):
+		metrics, metricSums = finishMetrics(self.baseSums, len(self.columns), self.genes, self.readTotals, self.rateTotals)
+		return {'networkTrackDict': self.networkTrackDict,
+				'subNetworkTrackDict': self.subNetworkTrackDict,
+				'pathwayLabels': self.pathwayLabels,
+				'metrics': metrics,
+				'metricSums': metricSums,
+				'genes': self.genes,
+				'columns': self.columns}
+
+# Reduces a mapped organism to what the merge needs, the whole count matrix as a single block
+def organismResult(matrix, links):
+	accumulator = OrganismAccumulator()
+	accumulator.add(matrix, links)
+	return accumulator.result()
+
+# Loads an organism's count matrix and KEGG map (or the cached parse of both) and places its loci with linkFunction
+	# With a chunkSize the count file is streamed in blocks of that many rows instead, without its count cache
+	# attribution is the keggIndex.attributionPolicies entry linkFunction places genes listed in several pathways with
+def _mappedOrganism(linkFunction, jsonFile, countFile, useCache, profiler, chunkSize, attribution):
+	organism = os.path.basename(jsonFile)[0:3]
+	with profiler.stage("loadMap", organism):
+		hierarchy = loadHierarchy(jsonFile, useCache=useCache)
+	if chunkSize is None:
+		with profiler.stage("loadCounts", organism):
+			matrix = loadCountFile(countFile, useCache=useCache)
+		with profiler.stage("map", organism):
+			links = linkFunction(hierarchy, matrix['loci'], attribution)
+		with profiler.stage("organismTotals", organism):
+			return organismResult(matrix, links)
+	accumulator = OrganismAccumulator()
+	chunks = countFileChunks(countFile, chunkSize)
+	while True:
+		with profiler.stage("loadCounts", organism):
+			matrix = next(chunks, None)
+		if matrix is None:
+			return accumulator.result()
+		with profiler.stage("map", organism):
+			links = linkFunction(hierarchy, matrix['loci'], attribution)
+		with profiler.stage("organismTotals", organism):
+			accumulator.add(matrix, links)
+
+# networkGraphing.py: genes are placed through the first listing of their locus (by default)
+def indexedOrganism(jsonFile, countFile, useCache=True, profiler=nullProfiler, chunkSize=None, attribution='first'):
+	return _mappedOrganism(firstHitLinks, jsonFile, countFile, useCache, profiler, chunkSize, attribution)
+
+# networkGraphing_hardCode.py: every category of the map is kept and genes count in every pathway listing them (by default)
+def traversedOrganism(jsonFile, countFile, useCache=True, profiler=nullProfiler, chunkSize=None, attribution='full'):
+	return _mappedOrganism(allHitLinks, jsonFile, countFile, useCache, profiler, chunkSize, attribution)
+
+# Category totals of every depth of the whole tree (see keggIndex.treeLinks), for maps of any depth
+	# Every listing of a gene counts, and categories of one depth sharing a label are added up
+	# Returns depthLabels and depthSums (labels x (metrics * timepoints) totals) per category depth, from 1 down
+def treeOrganism(jsonFile, countFile, useCache=True, profiler=nullProfiler, chunkSize=None):
+	organism = os.path.basename(jsonFile)[0:3]
+	with profiler.stage("loadMap", organism):
+		hierarchy = loadHierarchy(jsonFile, useCache=useCache)
+	with profiler.stage("loadCounts", organism):
+		chunks = [loadCountFile(countFile, useCache=useCache)] if chunkSize is None else countFileChunks(countFile, chunkSize)
+	nodeBase = None
+	genes = 0
+	for matrix in chunks:
+		with profiler.stage("map", organism):
+			geneRows, treeNodes = treeLinks(hierarchy, matrix['loci'], excludedCategories)
+		with profiler.stage("organismTotals", organism):
+			timepoints = len(matrix['columns'])
+			base = geneBase(matrix['counts'], matrix.get('lengths'))
+			if nodeBase is None:
+				nodeBase = np.zeros((len(hierarchy['treeEnd']), base.shape[1]))
+				geneTotals = np.zeros(base.shape[1])
+			nodeBase += subtreeTotals(base, geneRows, treeNodes, hierarchy['treeEnd'])
+			geneTotals += base.sum(axis=0)
+			genes += len(matrix['loci'])
+	with profiler.stage("organismTotals", organism):
+		rateTotals = geneTotals[2 * timepoints:] if len(geneTotals) > 2 * timepoints else None
+		metrics, nodeSums = finishMetrics(nodeBase, timepoints, genes, geneTotals[:timepoints], rateTotals)
+		categoryDepths = hierarchy['treeDepth'][hierarchy['treeLabel'] >= 0]
+		depthLabels = []
+		depthSums = []
+		for depth in range(1, int(categoryDepths.max()) + 1 if len(categoryDepths) else 1):
+			labelIDs, sums = depthTotals(nodeSums, hierarchy['treeDepth'], hierarchy['treeLabel'], depth)
+			depthLabels.append([hierarchy['labels'][labelID] for labelID in labelIDs])
+			depthSums.append(sums)
+		return {'depthLabels': depthLabels, 'depthSums': depthSums, 'metrics': metrics, 'genes': genes, 'columns': list(matrix['columns'])}
+
+# Totals per KEGG orthology (KO) of an organism's genes, each gene counts once for the KO of its first listing
+	# Genes are grouped by KO ID with one segmented reduction per block of the count file, whatever the number of genes
+	# Returns kos (KO strings of the KOs holding at least one gene, sorted) and metricSums (kos x (metrics * timepoints) totals)
+def koOrganism(jsonFile, countFile, useCache=True, profiler=nullProfiler, chunkSize=None):
+	organism = os.path.basename(jsonFile)[0:3]
+	with profiler.stage("loadMap", organism):
+		hierarchy = loadHierarchy(jsonFile, useCache=useCache)
+	with profiler.stage("loadCounts", organism):
+		chunks = [loadCountFile(countFile, useCache=useCache)] if chunkSize is None else countFileChunks(countFile, chunkSize)
+	koBase = None
+	genes = 0
+	for matrix in chunks:
+		with profiler.stage("map", organism):
+			rowKO = locusKOs(hierarchy, matrix['loci'])
+			geneRows = np.flatnonzero(rowKO >= 0)
+		with profiler.stage("organismTotals", organism):
+			timepoints = len(matrix['columns'])
+			base = geneBase(matrix['counts'], matrix.get('lengths'))
+			if koBase is None:
+				koBase = np.zeros((len(hierarchy['kos']), base.shape[1]))
+				koGenes = np.zeros(len(hierarchy['kos']), dtype=np.int64)
+				geneTotals = np.zeros(base.shape[1])
+			koBase += sparseTotals(base, geneRows, rowKO[geneRows], np.ones(len(geneRows)), len(koBase))
+			koGenes += np.bincount(rowKO[geneRows], minlength=len(koGenes))
+			geneTotals += base.sum(axis=0)
+			genes += len(matrix['loci'])
+	with profiler.stage("organismTotals", organism):
+		rateTotals = geneTotals[2 * timepoints:] if len(geneTotals) > 2 * timepoints else None
+		present = np.flatnonzero(koGenes)
+		kos = [hierarchy['kos'][koID] for koID in present]
+		order = np.argsort(kos, kind='stable')
+		metrics, metricSums = finishMetrics(koBase[present[order]], timepoints, genes, geneTotals[:timepoints], rateTotals)
+		return {'kos': [kos[i] for i in order], 'metrics': metrics, 'metricSums': metricSums, 'genes': genes, 'columns': list(matrix['columns'])}
+
+# Worker side of runOrganisms, stage records travel back with the result when profiling
+def _runOrganism(task):
+	function, jsonFile, countFile, useCache, profile, chunkSize, options = task
+	profiler = Profiler() if profile else nullProfiler
+	result = function(jsonFile, countFile, useCache, profiler, chunkSize, **options)
+	if profile:
+		result['profile'] = profiler.records
+	return result
+
+# Bumped whenever organismResult changes what it produces, which invalidates cached organism results
+resultVersion = 3
+
+# Cache entry of one organism's result, stored next to its count file
+	# Keyed by the SHA-1 of the JSON map and of the count file together with the analysis settings: the organism function,
+		# the excluded categories and the parser/loader versions. Each organism function keeps its own entry
+def resultEntry(function, jsonFile, countFile, attribution=None):
+	settings = [diskCache.fileDigest(jsonFile), diskCache.fileDigest(countFile), function.__name__,
+				"|".join(excludedCategories), str(parserVersion), str(loaderVersion), str(attribution)]
+	key = hashlib.sha1("\t".join(settings).encode("utf-8")).hexdigest()
+	return diskCache.cachePath(countFile, "result."+function.__name__, key, resultVersion)
+
+# Runs one of the organism functions above for every fileList row, in a process pool when jobs > 1
+	# Results come back in fileList order whatever the order the workers finish in
+	# With incremental (and useCache) each organism's result is cached, and only organisms whose inputs or settings changed are computed
+	# With a chunkSize count files are streamed in blocks of that many rows (see _mappedOrganism), results are the same
+	# attribution is passed on to the organism function unless None (its default policy)
+def runOrganisms(function, jsonFileList, countFileList, useCache=True, jobs=1, profiler=nullProfiler, incremental=False, chunkSize=None,
+					attribution=None):
+	resultList = [None] * len(jsonFileList)
+	entries = [None] * len(jsonFileList)
+	if incremental and useCache:
+		for i in range(len(jsonFileList)):
+			with profiler.stage("resultCache", os.path.basename(jsonFileList[i])[0:3]):
+				entries[i] = resultEntry(function, jsonFileList[i], countFileList[i], attribution)
+				resultList[i] = diskCache.readCache(entries[i])
+	pending = [i for i in range(len(jsonFileList)) if resultList[i] is None]
+	options = {} if attribution is None else {'attribution': attribution}
+	tasks = [(function, jsonFileList[i], countFileList[i], useCache, profiler.enabled, chunkSize, options) for i in pending]
+	if jobs > 1 and len(tasks) > 1:
+		pool = multiprocessing.Pool(min(jobs, len(tasks)))
+		try:
+			computedList = pool.map(_runOrganism, tasks, chunksize=1)
+		finally:
+			pool.close()
+			pool.join()
+	else:
+		computedList = [_runOrganism(task) for task in tasks]
+	for i, result in zip(pending, computedList):
+		profiler.merge(result.pop('profile', {}))
+		resultList[i] = result
+		if entries[i] is not None:
+			# Only the entry of the same key is replaced, entries of other settings (e.g. another attribution) stay usable
+			diskCache.writeCache(entries[i], result)
+	return resultList
+
+# Adds the links of one track dictionary to a merged one, each child is listed once per key
+def _mergeTrackDict(merged, members, trackDict):
+	for key in trackDict:
+		if key not in merged:
+			merged[key] = []
+			members[key] = set()
+		for child in trackDict[key]:
+			if child not in members[key]:
+				members[key].add(child)
+				merged[key].append(child)
+
+# Merges the category links of every organism, in order, into shared track dictionaries
+	# Returns networkTrackDict, subNetworkTrackDict and the pathway labels in order of first appearance
+def mergeOrganisms(resultList):
+	networkTrackDict = {}
+	subNetworkTrackDict = {}
+	networkMembers = {}
+	subNetworkMembers = {}
+	pathwayLabels = []
+	pathwaySet = set()
+	for result in resultList:
+		_mergeTrackDict(networkTrackDict, networkMembers, result['networkTrackDict'])
+		_mergeTrackDict(subNetworkTrackDict, subNetworkMembers, result['subNetworkTrackDict'])
+		for label in result['pathwayLabels']:
+			if label not in pathwaySet:
+				pathwaySet.add(label)
+				pathwayLabels.append(label)
+	return networkTrackDict, subNetworkTrackDict, pathwayLabels
+
+# Places an organism's pathways x timepoints totals of one metric (all metrics side by side if None) on the shared pathway order
+def pathwayMatrix(result, pathwayLabels, metric='raw'):
+	rows = dict((pathwayLabels[i], i) for i in range(len(pathwayLabels)))
+	sums = result['metricSums']
+	if metric is not None:
+		sums = sums[:, metricColumns(result['metrics'], metric, len(result['columns']))]
+	matrix = np.zeros((len(pathwayLabels), sums.shape[1]))
+	np.add.at(matrix, [rows[label] for label in result['pathwayLabels']], sums)
+	return matrix
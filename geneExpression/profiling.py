@@ -0,0 +1,144 @@
+# Stage profiler for the graphing and histogram scripts
+	# Each pipeline stage is recorded per organism and per timepoint with its call count, wall time, CPU time,
+		# peak traced Python memory (tracemalloc) and the process' peak RSS at the end of the stage
+	# nullProfiler stands in when profiling is off, its stages do nothing
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+# Process peak resident set size in bytes (ru_maxrss is in kilobytes on Linux and in bytes on macOS)
+def maxRSS():
+	if resource is None:
+		return 0
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak if sys.platform == "darwin" else peak * 1024
+
+class _NullStage(object):
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		return False
+
+class NullProfiler(object):
+	enabled = False
+	records = {}
+	_stage = _NullStage()
+
+	def stage(self, name, organism=None, timepoint=None):
+		return self._stage
+
+	def merge(self, records):
+		pass
+
+nullProfiler = NullProfiler()
+
+class _Stage(object):
+	def __init__(self, profiler, key):
+		self.profiler = profiler
+		self.key = key
+
+	def __enter__(self):
+		self.profiler._enter(self)
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		self.profiler._exit(self)
+		return False
+
+class Profiler(object):
+	enabled = True
+
+	def __init__(self, traceMemory=True):
+		# (stage, organism, timepoint) -> {'calls', 'wall', 'cpu', 'peakTracedBytes', 'maxRSSBytes'}
+		self.records = {}
+		self.traceMemory = traceMemory
+		self._stack = []
+		if traceMemory and not tracemalloc.is_tracing():
+			tracemalloc.start()
+
+	def stage(self, name, organism=None, timepoint=None):
+		return _Stage(self, (name, organism, timepoint))
+
+	def _enter(self, stage):
+		if self.traceMemory:
+			# The enclosing stage keeps the peak reached so far before the peak is reset for this one
+			if self._stack:
+				self._stack[-1].peak = max(self._stack[-1].peak, tracemalloc.get_traced_memory()[1])
+			if hasattr(tracemalloc, 'reset_peak'):
+				tracemalloc.reset_peak()
+		stage.peak = 0
+		self._stack.append(stage)
+		stage.cpu = time.process_time()
+		stage.wall = time.perf_counter()
+
+	def _exit(self, stage):
+		wall = time.perf_counter() - stage.wall
+		cpu = time.process_time() - stage.cpu
+		self._stack.pop()
+		peak = 0
+		if self.traceMemory:
+			peak = max(stage.peak, tracemalloc.get_traced_memory()[1])
+			if self._stack:
+				self._stack[-1].peak = max(self._stack[-1].peak, peak)
+		self._add(stage.key, {'calls': 1, 'wall': wall, 'cpu': cpu, 'peakTracedBytes': peak, 'maxRSSBytes': maxRSS()})
+
+	def _add(self, key, record):
+		if key in self.records:
+			current = self.records[key]
+			for field in ('calls', 'wall', 'cpu'):
+				current[field] += record[field]
+			for field in ('peakTracedBytes', 'maxRSSBytes'):
+				current[field] = max(current[field], record[field])
+		else:
+			self.records[key] = dict(record)
+
+	# Adds records produced elsewhere, e.g. returned by a worker process
+	def merge(self, records):
+		for key in records:
+			self._add(key, records[key])
+
+	def report(self, entryPoint):
+		stageList = []
+		for key in self.records:
+			record = dict(self.records[key])
+			record['stage'], record['organism'], record['timepoint'] = key
+			stageList.append(record)
+		stageList.sort(key=lambda record: (record['stage'], str(record['organism']), str(record['timepoint'])))
+		return {'entryPoint': entryPoint, 'argv': sys.argv[1:], 'pid': os.getpid(), 'maxRSSBytes': maxRSS(), 'stages': stageList}
+
+	def writeReport(self, path, entryPoint):
+		with open(path, 'w') as f:
+			json.dump(self.report(entryPoint), f, indent=1)
+
+	# Short table with one line per stage, summed over organisms and timepoints
+	def summary(self):
+		totals = {}
+		order = []
+		for key in self.records:
+			if key[0] not in totals:
+				totals[key[0]] = {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peakTracedBytes': 0, 'maxRSSBytes': 0}
+				order.append(key[0])
+			total = totals[key[0]]
+			for field in ('calls', 'wall', 'cpu'):
+				total[field] += self.records[key][field]
+			for field in ('peakTracedBytes', 'maxRSSBytes'):
+				total[field] = max(total[field], self.records[key][field])
+		lines = ["%-20s %7s %10s %10s %12s %12s" % ("stage", "calls", "wall (s)", "cpu (s)", "traced (MB)", "RSS (MB)")]
+		for name in sorted(order, key=lambda name: -totals[name]['wall']):
+			total = totals[name]
+			lines.append("%-20s %7d %10.3f %10.3f %12.1f %12.1f" % (name, total['calls'], total['wall'], total['cpu'],
+						total['peakTracedBytes'] / 1e6, total['maxRSSBytes'] / 1e6))
+		return "\n".join(lines)
+
+# Profiler for an entry point's --profile option
+def makeProfiler(enabled):
+	return Profiler() if enabled else nullProfiler
@@ -0,0 +1,141 @@
+# Headless rendering of the resource distribution bar charts
+	# Charts are described as plain dictionaries first and drawn afterwards, in worker processes when asked to,
+		# on the non-interactive Agg backend. Each process reuses a single figure and closes it once done
+
+import multiprocessing
+import numpy as np
+from .profiling import Profiler, nullProfiler
+
+_figure = None
+
+def _pyplot():
+	import matplotlib
+	matplotlib.use('Agg')
+	from matplotlib import pyplot as plt
+	return plt
+
+# Returns this process' figure, cleared and resized, so charts do not accumulate figures in memory
+def _reusableFigure(figSize):
+	global _figure
+	plt = _pyplot()
+	if _figure is None:
+		_figure = plt.figure(figsize=figSize)
+	else:
+		_figure.clf()
+		_figure.set_size_inches(figSize, forward=False)
+	return _figure
+
+def closeFigure():
+	global _figure
+	if _figure is not None:
+		_pyplot().close(_figure)
+		_figure = None
+
+# Describes one chart of a combined dictionary, saved as <save>_<index>.png. Labels are sorted once here
+def chartJob(countDict, organismList, title, save, index, figSize=(10,6), labSize=5, yPlotLabel="", xPlotLabel="",
+			rotate_legend=False, bottom_adj=None):
+	labelList = sorted(countDict)
+	values = np.array([countDict[label] for label in labelList], dtype=float).reshape(len(labelList), len(organismList))
+	return levelChartJob(labelList, values, organismList, title, save, index, figSize, labSize, yPlotLabel, xPlotLabel, rotate_legend, bottom_adj)
+
+# Describes one chart of a level already pruned and sorted by aggregation.prunedLevel, labels x organisms values
+def levelChartJob(labelList, values, organismList, title, save, index, figSize=(10,6), labSize=5, yPlotLabel="", xPlotLabel="",
+			rotate_legend=False, bottom_adj=None):
+	return {'kind': 'chart', 'labels': list(labelList), 'values': values, 'organisms': list(organismList), 'title': title,
+			'prefix': save, 'index': index, 'save': save+'_'+str(index)+'.png', 'figSize': figSize, 'labSize': labSize, 'yPlotLabel': yPlotLabel, 'xPlotLabel': xPlotLabel,
+			'rotate': 90 if rotate_legend else 0, 'bottom_adj': bottom_adj}
+
+# Grouped bars, one group per label and one bar per organism, laid out like pandas' DataFrame.plot.bar
+def _drawBars(ax, labels, values, organisms, rotate, labSize):
+	positions = np.arange(len(labels))
+	width = 0.5 / max(len(organisms), 1)
+	for i in range(len(organisms)):
+		offset = (i - (len(organisms) - 1) / 2.0) * width
+		ax.bar(positions + offset, values[:, i], width, label=organisms[i], color="C"+str(i % 10))
+	ax.set_xticks(positions)
+	ax.set_xticklabels(labels, rotation=rotate)
+	ax.set_xlim(-0.5, len(labels) - 0.5)
+	ax.xaxis.set_tick_params(labelsize=labSize)
+
+def renderChart(job):
+	if job['kind'] == 'smallMultiples':
+		return renderSmallMultiples(job)
+	fig = _reusableFigure(job['figSize'])
+	ax = fig.add_subplot(111)
+	_drawBars(ax, job['labels'], job['values'], job['organisms'], job['rotate'], job['labSize'])
+	# Anchors legend to outer edge of graph
+	ax.legend(bbox_to_anchor=(1., 1.), loc=2, borderaxespad=0., title="Organism")
+	fig.subplots_adjust(bottom=job['bottom_adj'])
+	ax.set_title(job['title'])
+	ax.set_ylabel(job['yPlotLabel'])
+	ax.set_xlabel(job['xPlotLabel'], labelpad=20)
+	fig.savefig(job['save'])
+	return job['save']
+
+# Groups chart jobs by level (their file prefix) into one small-multiples figure per level, one panel per timepoint
+def smallMultiplesJobs(jobList, prefixList):
+	groupList = []
+	for prefix in prefixList:
+		panels = [job for job in jobList if job['prefix'] == prefix]
+		if panels:
+			groupList.append({'kind': 'smallMultiples', 'panels': panels, 'prefix': prefix, 'save': prefix+'_all.png'})
+	return groupList
+
+# All panels share one x axis, so every timepoint is drawn over the union of the level's labels
+def renderSmallMultiples(job):
+	panels = job['panels']
+	labels = sorted(set(label for panel in panels for label in panel['labels']))
+	organisms = panels[0]['organisms']
+	width, height = panels[0]['figSize']
+	fig = _reusableFigure((width, 2.5 * len(panels) + 2))
+	axes = fig.subplots(len(panels), 1, sharex=True, squeeze=False)[:, 0]
+	for i in range(len(panels)):
+		rows = dict((panels[i]['labels'][j], j) for j in range(len(panels[i]['labels'])))
+		values = np.zeros((len(labels), len(organisms)))
+		for j in range(len(labels)):
+			if labels[j] in rows:
+				values[j] = panels[i]['values'][rows[labels[j]]]
+		_drawBars(axes[i], labels, values, organisms, panels[i]['rotate'], panels[i]['labSize'])
+		axes[i].set_title(panels[i]['title'], fontsize=9)
+		axes[i].set_ylabel(panels[i]['yPlotLabel'], fontsize=6)
+	axes[0].legend(bbox_to_anchor=(1., 1.), loc=2, borderaxespad=0., title="Organism")
+	axes[-1].set_xlabel(panels[-1]['xPlotLabel'], labelpad=20)
+	fig.tight_layout()
+	fig.savefig(job['save'])
+	return job['save']
+
+def _renderAll(jobList, profiler=nullProfiler):
+	try:
+		savedList = []
+		for job in jobList:
+			with profiler.stage("render:"+str(job.get('prefix', '')), None, job.get('index')):
+				savedList.append(renderChart(job))
+		return savedList
+	finally:
+		closeFigure()
+
+# Worker side of renderCharts, stage records travel back with the file names when profiling
+def _renderBatch(task):
+	jobList, profile = task
+	profiler = Profiler() if profile else nullProfiler
+	return _renderAll(jobList, profiler), profiler.records
+
+# Renders every job, split across a process pool when processes > 1, and returns the written file names in job order
+def renderCharts(jobList, processes=1, profiler=nullProfiler):
+	if processes > 1 and len(jobList) > 1:
+		processes = min(processes, len(jobList))
+		# One batch per worker so each worker reuses its figure across several charts
+		batchList = [jobList[i::processes] for i in range(processes)]
+		pool = multiprocessing.Pool(processes)
+		try:
+			renderedList = pool.map(_renderBatch, [(batch, profiler.enabled) for batch in batchList], chunksize=1)
+		finally:
+			pool.close()
+			pool.join()
+		saved = {}
+		for i in range(processes):
+			profiler.merge(renderedList[i][1])
+			for j in range(len(batchList[i])):
+				saved[i + j * processes] = renderedList[i][0][j]
+		return [saved[i] for i in range(len(jobList))]
+	return _renderAll(jobList, profiler)
@@ -0,0 +1,202 @@
+# Local query service over a fileList, the parsed KEGG maps and count matrices stay in memory between queries
+	# Before every query the size and modification time of each input are compared with those loaded, an organism whose files
+		# changed is reloaded and remapped, and the merge across organisms is redone. Other organisms are not touched
+	# Combined dictionaries are kept per method, timepoint and metric until the next reload, so repeated queries are lookups
+	# Queries are answered as JSON over HTTP on a local port or a Unix socket:
+		# /status: organisms, timepoint labels, metrics and the time each organism was loaded
+		# /query?method=relative&level=Pathway&timepoint=LLP&organism=ebr&metric=raw&label=...
+			# every parameter is optional, timepoint is a header label or a 1 based index (the first timepoint by default),
+				# values are those of the charts (empty categories are dropped from relative distributions by aggregation.prunedLevel)
+
+import json
+import os
+import socketserver
+import stat
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+from . import diskCache
+from .profiling import nullProfiler
+from .keggIndex import loadHierarchy, firstHitLinks, allHitLinks
+from .countFiles import loadCountFile
+from .pipeline import organismResult
+from .aggregation import prunedLevel
+from .analysis import organismName, relativeFromResults, traversalFromResults, combinedArrays
+
+# method -> (link function, merge of the organism results, whether charts drop empty categories)
+serviceMethods = {'relative': (firstHitLinks, relativeFromResults, True), 'traversal': (allHitLinks, traversalFromResults, False)}
+queryParameters = ['method', 'level', 'timepoint', 'organism', 'metric', 'label']
+
+class ExpressionService(object):
+	def __init__(self, jsonFileList, countFileList, useCache=True, profiler=nullProfiler):
+		self.jsonFileList = list(jsonFileList)
+		self.countFileList = list(countFileList)
+		self.useCache = useCache
+		self.profiler = profiler
+		self.hierarchies = [None] * len(self.jsonFileList)
+		self.matrices = [None] * len(self.jsonFileList)
+		self.stamps = [(None, None)] * len(self.jsonFileList)
+		self.loaded = [None] * len(self.jsonFileList)
+		self.results = dict((method, [None] * len(self.jsonFileList)) for method in serviceMethods)
+		self.distributions = {}
+		self._combined = {}
+		self._lock = threading.Lock()
+		self.refresh()
+
+	# Reloads the organisms whose JSON or count file changed since they were loaded, returns their names
+		# A file that cannot be read (e.g. while it is being replaced) keeps its resident copy until the next query
+	def refresh(self):
+		reloaded = []
+		for i in range(len(self.jsonFileList)):
+			organism = organismName(self.jsonFileList[i])
+			try:
+				stamp = (diskCache.fileStamp(self.jsonFileList[i]), diskCache.fileStamp(self.countFileList[i]))
+				if stamp == self.stamps[i]:
+					continue
+				if stamp[0] != self.stamps[i][0]:
+					with self.profiler.stage("loadMap", organism):
+						self.hierarchies[i] = loadHierarchy(self.jsonFileList[i], useCache=self.useCache)
+				if stamp[1] != self.stamps[i][1]:
+					with self.profiler.stage("loadCounts", organism):
+						self.matrices[i] = loadCountFile(self.countFileList[i], useCache=self.useCache)
+			except (IOError, OSError, ValueError):
+				if self.hierarchies[i] is None or self.matrices[i] is None:
+					raise
+				continue
+			self.stamps[i] = stamp
+			self.loaded[i] = time.time()
+			for method in serviceMethods:
+				self.results[method][i] = None
+			reloaded.append(organism)
+		if reloaded:
+			self.distributions = {}
+			self._combined = {}
+		return reloaded
+
+	# Distribution of one method, only organisms reloaded since the last merge are mapped again
+	def distribution(self, method='relative'):
+		if method not in serviceMethods:
+			raise ValueError("Unknown method "+str(method)+", expected one of "+", ".join(sorted(serviceMethods)))
+		if method not in self.distributions:
+			linkFunction, fromResults, clean = serviceMethods[method]
+			resultList = self.results[method]
+			for i in range(len(resultList)):
+				if resultList[i] is None:
+					with self.profiler.stage("map", organismName(self.jsonFileList[i])):
+						resultList[i] = organismResult(self.matrices[i], linkFunction(self.hierarchies[i], self.matrices[i]['loci']))
+			self.distributions[method] = fromResults(self.jsonFileList, resultList, self.profiler)
+		return self.distributions[method]
+
+	# Sorted labels and labels x organisms values of every level as the charts show them
+	def combined(self, method, timepoint, metric):
+		key = (method, timepoint, metric)
+		if key not in self._combined:
+			levelList = combinedArrays(self.distribution(method), timepoint, metric, self.profiler)
+			self._combined[key] = [prunedLevel(labels, values, dropEmpty=serviceMethods[method][2]) for labels, values in levelList]
+		return self._combined[key]
+
+	def status(self):
+		with self._lock:
+			self.refresh()
+			distribution = self.distribution('relative')
+			return {'organisms': distribution['organisms'], 'timepoints': distribution['timepointLabels'], 'metrics': distribution['metrics'],
+					'levels': distribution['levels'],
+					'loaded': dict((organismName(self.jsonFileList[i]), self.loaded[i]) for i in range(len(self.jsonFileList)))}
+
+	# Values of the matching labels per level, with one value per organism asked for
+	def query(self, method='relative', level=None, timepoint=None, organism=None, metric='raw', label=None):
+		with self._lock:
+			self.refresh()
+			distribution = self.distribution(method)
+			timepoint = _timepointIndex(distribution, timepoint)
+			levels = _selected(distribution['levels'], level, "level")
+			organisms = _selected(distribution['organisms'], organism, "organism")
+			combinedList = self.combined(method, timepoint, metric)
+			columns = [distribution['organisms'].index(other) for other in organisms]
+			values = {}
+			for levelName in levels:
+				labels, levelValues = combinedList[distribution['levels'].index(levelName)]
+				values[levelName] = {}
+				for i in range(len(labels)):
+					name = labels[i].replace("\n", " ")
+					if label is None or label == name or label == labels[i]:
+						values[levelName][name] = levelValues[i, columns].tolist()
+			return {'method': method, 'metric': metric, 'timepoint': distribution['timepointLabels'][timepoint], 'timepointIndex': timepoint+1,
+					'organisms': organisms, 'values': values}
+
+# Every name when None, otherwise the one matching name (levels match whatever their case)
+def _selected(names, name, kind):
+	if name is None:
+		return list(names)
+	for candidate in names:
+		if candidate.lower() == name.lower():
+			return [candidate]
+	raise ValueError("Unknown "+kind+" "+str(name)+", expected one of "+", ".join(names))
+
+# A timepoint label from the count file headers or a 1 based index
+def _timepointIndex(distribution, timepoint):
+	if timepoint is None:
+		return 0
+	if timepoint in distribution['timepointLabels']:
+		return distribution['timepointLabels'].index(timepoint)
+	try:
+		index = int(timepoint) - 1
+	except ValueError:
+		index = -1
+	if index < 0 or index >= distribution['timepoints']:
+		raise ValueError("Unknown timepoint "+str(timepoint)+", expected one of "+", ".join(distribution['timepointLabels'])+
+							" or 1 to "+str(distribution['timepoints']))
+	return index
+
+class _QueryHandler(BaseHTTPRequestHandler):
+	def do_GET(self):
+		url = urlparse(self.path)
+		parameters = dict((key, values[-1]) for key, values in parse_qs(url.query).items() if key in queryParameters)
+		service = self.server.service
+		try:
+			if url.path == '/status':
+				self._reply(200, service.status())
+			elif url.path == '/query':
+				self._reply(200, service.query(**parameters))
+			else:
+				self._reply(404, {'error': "Unknown path "+url.path+", expected /status or /query"})
+		except ValueError as error:
+			self._reply(400, {'error': str(error)})
+
+	def _reply(self, status, body):
+		payload = json.dumps(body).encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(payload)))
+		self.end_headers()
+		self.wfile.write(payload)
+
+	# Unix socket clients have no address, and a query log is not wanted
+	def log_message(self, format, *args):
+		pass
+
+class _TCPServer(socketserver.ThreadingMixIn, HTTPServer):
+	daemon_threads = True
+
+# Unix sockets are not available on every platform
+if hasattr(socketserver, 'UnixStreamServer'):
+	class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+		daemon_threads = True
+
+# True when nothing but (possibly a stale) Unix socket sits at path, so it can be replaced
+def socketPathFree(path):
+	return not os.path.lexists(path) or stat.S_ISSOCK(os.lstat(path).st_mode)
+
+# HTTP server of a service on host:port, or on a Unix socket at socketPath (a stale socket file is replaced, any other file is kept)
+def makeServer(service, port=8765, host="127.0.0.1", socketPath=None):
+	if socketPath is not None:
+		if not socketPathFree(socketPath):
+			raise ValueError(socketPath+" exists and is not a socket")
+		if os.path.lexists(socketPath):
+			os.remove(socketPath)
+		server = _UnixServer(socketPath, _QueryHandler)
+	else:
+		server = _TCPServer((host, port), _QueryHandler)
+	server.service = service
+	return server
@@ -0,0 +1,133 @@
+# Significance of the differences between two organisms' relative distributions, for every level, category and timepoint
+	# The statistic is the difference of the two organisms' chart values: a category's read count over the organism's total,
+		# rolled up every level with the rollup matrices of the distribution, so observed differences are the charted ones
+	# permutation: the organism labels of the pair's pooled genes are shuffled (group sizes kept), two-sided p-values
+	# bootstrap: each organism's genes are resampled with replacement, percentile confidence intervals
+	# Replicates run in batches as one replicates x genes weight matrix times the pair's genes x pathways counts,
+		# batches are spread over a process pool and seeded by their index, so results do not depend on the number of jobs
+	# Only genes placed in the hierarchy take part, the others add to no category and to no total
+
+import itertools
+import multiprocessing
+import numpy as np
+from .profiling import nullProfiler
+from .keggIndex import loadHierarchy, firstHitLinks, allHitLinks
+from .countFiles import loadCountFile
+from .aggregation import membershipMatrix, rollupTotals, relativeTotals
+
+statisticsColumns = ['level', 'label', 'timepoint', 'timepointIndex', 'organismA', 'organismB', 'difference', 'pValue', 'qValue',
+						'ciLower', 'ciUpper']
+
+# Read counts and genes x pathways membership weights, on the distribution's pathway order, of an organism's placed genes
+def placedGenes(distribution, jsonFile, countFile, useCache=True):
+	linkFunction = firstHitLinks if distribution['method'] == 'relative' else allHitLinks
+	matrix = loadCountFile(countFile, useCache=useCache)
+	links = linkFunction(loadHierarchy(jsonFile, useCache=useCache), matrix['loci'], distribution['attribution'])
+	rows = dict((distribution['labels'][2][i], i) for i in range(len(distribution['labels'][2])))
+	pathwayRows = np.array([rows[label] for label in links['pathwayLabels']], dtype=np.int64)
+	membership = membershipMatrix(len(matrix['loci']), len(rows), links['geneRows'], pathwayRows[links['pathwayColumns']], links['weights'])
+	placed = np.flatnonzero(membership.any(axis=1))
+	return {'counts': np.asarray(matrix['counts'], dtype=np.float64)[placed, :distribution['timepoints']], 'membership': membership[placed]}
+
+# Relative totals of every level for replicates x pathways sums, one categories x replicates array per level
+def _levelShares(sums, rollup):
+	levels = rollupTotals(sums.T, rollup[0], rollup[1])
+	total = levels[0].sum(axis=0)
+	return [relativeTotals(level, total) for level in levels]
+
+# Worker side of significanceTests: differences of one batch of replicates, one categories x replicates array per level
+	# countsA and countsB are the genes x pathways read counts of the two organisms at one timepoint
+def _replicateBatch(task):
+	kind, countsA, countsB, rollup, replicates, seed = task
+	random = np.random.RandomState(seed)
+	if kind == 'permutation':
+		pooled = np.vstack([countsA, countsB])
+		# Each replicate takes a random len(countsA) of the pooled genes as organism A
+		drawn = np.argpartition(random.random_sample((replicates, len(pooled))), len(countsA), axis=1)[:, :len(countsA)]
+		weights = np.zeros((replicates, len(pooled)))
+		weights[np.arange(replicates)[:, None], drawn] = 1.0
+		sumsA = weights.dot(pooled)
+		sumsB = pooled.sum(axis=0) - sumsA
+	else:
+		# Times each gene is drawn when an organism's genes are resampled with replacement
+		sumsA = random.multinomial(len(countsA), np.full(len(countsA), 1.0 / len(countsA)), size=replicates).dot(countsA)
+		sumsB = random.multinomial(len(countsB), np.full(len(countsB), 1.0 / len(countsB)), size=replicates).dot(countsB)
+	return [sharesA - sharesB for sharesA, sharesB in zip(_levelShares(sumsA, rollup), _levelShares(sumsB, rollup))]
+
+# Benjamini-Hochberg adjusted p-values
+def adjustedPValues(pValues):
+	pValues = np.asarray(pValues, dtype=np.float64)
+	if not len(pValues):
+		return pValues
+	order = np.argsort(pValues)
+	ranked = pValues[order] * len(pValues) / np.arange(1, len(pValues) + 1)
+	adjusted = np.empty(len(pValues))
+	adjusted[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+	return adjusted
+
+# Permutation p-values and bootstrap confidence intervals for every pair of organisms, level, category and timepoint
+	# Returns rows in statisticsColumns order, q-values adjust the p-values of one pair, level and timepoint
+		# Categories empty in both organisms are left out
+	# Replicates are run batchSize at a time, in a process pool when jobs > 1
+def significanceTests(distribution, jsonFileList, countFileList, permutations=1000, bootstraps=1000, confidence=0.95, seed=0,
+						batchSize=250, jobs=1, useCache=True, profiler=nullProfiler):
+	if distribution['rollup'] is None:
+		raise ValueError("Significance tests need a relative or traversal distribution, not a "+str(distribution['method'])+" one")
+	organismList = distribution['organisms']
+	rollup = distribution['rollup']
+	geneList = []
+	for i in range(len(organismList)):
+		with profiler.stage("placedGenes", organismList[i]):
+			geneList.append(placedGenes(distribution, jsonFileList[i], countFileList[i], useCache))
+	comparisons = []
+	tasks = []
+	for a, b in itertools.combinations(range(len(organismList)), 2):
+		if not len(geneList[a]['counts']) or not len(geneList[b]['counts']):
+			continue
+		for timepoint in range(distribution['timepoints']):
+			countsA = geneList[a]['membership'] * geneList[a]['counts'][:, timepoint][:, None]
+			countsB = geneList[b]['membership'] * geneList[b]['counts'][:, timepoint][:, None]
+			batches = {}
+			for kind, replicates in (('permutation', permutations), ('bootstrap', bootstraps)):
+				batches[kind] = []
+				for start in range(0, replicates, batchSize):
+					batches[kind].append(len(tasks))
+					# Seeded by comparison, kind and batch so results do not depend on jobs or batch order
+					tasks.append((kind, countsA, countsB, rollup, min(batchSize, replicates - start),
+									[seed, a, b, timepoint, 0 if kind == 'permutation' else 1, start // batchSize]))
+			observed = (_levelShares(countsA.sum(axis=0)[None, :], rollup), _levelShares(countsB.sum(axis=0)[None, :], rollup))
+			comparisons.append((a, b, timepoint, observed, batches))
+	with profiler.stage("replicates"):
+		if jobs > 1 and len(tasks) > 1:
+			pool = multiprocessing.Pool(min(jobs, len(tasks)))
+			try:
+				differenceList = pool.map(_replicateBatch, tasks, chunksize=1)
+			finally:
+				pool.close()
+				pool.join()
+		else:
+			differenceList = [_replicateBatch(task) for task in tasks]
+	rows = []
+	tail = (1.0 - confidence) / 2.0 * 100.0
+	with profiler.stage("significance"):
+		for a, b, timepoint, observed, batches in comparisons:
+			for level in range(len(observed[0])):
+				difference = observed[0][level][:, 0] - observed[1][level][:, 0]
+				shown = np.flatnonzero((observed[0][level][:, 0] != 0) | (observed[1][level][:, 0] != 0))
+				# Without replicates of a kind its columns are NaN
+				pValues = np.full(len(difference), np.nan)
+				qValues = np.full(len(difference), np.nan)
+				if batches['permutation']:
+					permuted = np.hstack([differenceList[i][level] for i in batches['permutation']])
+					# Replicates at least as extreme as the observed difference, the observed labelling counts as one of them
+					extreme = (np.abs(permuted) >= np.abs(difference)[:, None] - 1e-12).sum(axis=1)
+					pValues = (extreme + 1.0) / (permuted.shape[1] + 1.0)
+					qValues[shown] = adjustedPValues(pValues[shown])
+				interval = np.full((2, len(difference)), np.nan)
+				if batches['bootstrap']:
+					interval = np.percentile(np.hstack([differenceList[i][level] for i in batches['bootstrap']]), [tail, 100.0 - tail], axis=1)
+				for i in shown:
+					rows.append((distribution['levels'][level], distribution['labels'][level][i].replace("\n", " "), distribution['timepointLabels'][timepoint],
+								timepoint+1, organismList[a], organismList[b], float(difference[i]), float(pValues[i]), float(qValues[i]),
+								float(interval[0][i]), float(interval[1][i])))
+	return rows
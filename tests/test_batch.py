@@ -0,0 +1,55 @@
+# Batch runs on the synthetic data set (see benchmarks/synthetic.py): a fileList paired with the same counts written without
+	# a header line, as the shipped protein counts are, must agree row for row under the header's timepoint names
+
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+testDir = os.path.dirname(os.path.abspath(__file__))
+repositoryDir = os.path.dirname(testDir)
+sys.path.insert(0, repositoryDir)
+sys.path.insert(0, os.path.join(repositoryDir, "benchmarks"))
+
+from synthetic import writeDataset
+from geneExpression.analysis import readFileList
+from geneExpression.batch import runBatch, pairColumns
+
+class HeaderlessPairTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.named = writeDataset(self.directory, organisms=2, genes=150, networks=3, fanOut=2, seed=0)[0]
+		jsonFileList, countFileList = readFileList(self.named)
+		self.headerless = os.path.join(self.directory, "headerless.txt")
+		with open(self.headerless, "w") as h:
+			for jsonFile, countFile in zip(jsonFileList, countFileList):
+				with open(countFile) as f:
+					lines = f.readlines()
+				headerless = countFile.replace(".txt", ".headerless.txt")
+				with open(headerless, "w") as f:
+					f.writelines(lines[1:])
+				h.write(jsonFile+"\t"+headerless+"\n")
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def pairedTable(self, method):
+		out = os.path.join(self.directory, "out")
+		runBatch([("named", "counts", self.named), ("headerless", "counts", self.headerless)], out, method, useCache=False)
+		with open(os.path.join(out, "named_vs_headerless."+method+".tsv")) as f:
+			rows = list(csv.reader(f, delimiter="\t"))
+		self.assertEqual(rows[0], pairColumns)
+		return [dict(zip(pairColumns, row)) for row in rows[1:]]
+
+	def testSameValues(self):
+		for method in ["relative", "traversal"]:
+			rows = self.pairedTable(method)
+			self.assertTrue(rows)
+			for row in rows:
+				self.assertEqual(row['timepoint'], "T"+row['timepointIndex'])
+				self.assertEqual(float(row['difference']), 0.0)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,76 @@
+# Count store lookups and the --countReport rows on a small synthetic data set (see benchmarks/synthetic.py)
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+testDir = os.path.dirname(os.path.abspath(__file__))
+repositoryDir = os.path.dirname(testDir)
+sys.path.insert(0, repositoryDir)
+sys.path.insert(0, os.path.join(repositoryDir, "benchmarks"))
+
+from synthetic import writeDataset
+from geneExpression import cli
+from geneExpression.analysis import readFileList
+from geneExpression.countStore import CountStore, loadCountStore
+
+class CountStoreTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		fileList = writeDataset(self.directory, organisms=2, genes=20, networks=2, fanOut=2, unmapped=0.0, seed=0)[0]
+		self.jsonFileList, self.countFileList = readFileList(fileList)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def writeCounts(self, name, rows):
+		path = os.path.join(self.directory, name)
+		with open(path, "w") as f:
+			f.write("locus\tT1\tT2\n")
+			for row in rows:
+				f.write("\t".join(str(field) for field in row)+"\n")
+		return path
+
+	def testLookup(self):
+		store = CountStore(["a00", "b00"], [{'loci': ["X", "Y"], 'columns': ["T1", "T2"], 'counts': np.array([[1.0, 2.0], [3.0, 4.0]])},
+											{'loci': ["X"], 'columns': ["T1", "T2"], 'counts': np.array([[5.0, 6.0]])}])
+		self.assertEqual(store.lookup("a00", "Y").tolist(), [3.0, 4.0])
+		self.assertEqual(store.lookup("b00", "X").tolist(), [5.0, 6.0])
+		self.assertEqual(store.rows("a00", ["X", "Z"]).tolist(), [0, -1])
+		self.assertFalse(("b00", "Y") in store)
+		self.assertEqual(store.organismCounts("b00").tolist(), [[5.0, 6.0]])
+
+	# Collisions across organisms, loci repeated within one file and loci missing from the organism's map
+	def testReport(self):
+		first = self.writeCounts("first.txt", [("A00_000001", 1, 2), ("A00_000002", 3, 4), ("A00_000002", 5, 6), ("A00_999999", 7, 8)])
+		second = self.writeCounts("second.txt", [("A00_000001", 1, 1), ("A01_000001", 2, 2)])
+		store, hierarchies = loadCountStore([self.jsonFileList[0], self.jsonFileList[1]], [first, second], useCache=False)
+		self.assertEqual(sorted(store.report(hierarchies)),
+						sorted([('collision', 'a00', 'A00_000001', 'a01'), ('collision', 'a01', 'A00_000001', 'a00'),
+								('duplicate', 'a00', 'A00_000002', '2 rows'),
+								('unmapped', 'a00', 'A00_999999', ''), ('unmapped', 'a01', 'A00_000001', '')]))
+		# A repeated locus is looked up at its last row
+		self.assertEqual(store.lookup("a00", "A00_000002").tolist(), [5.0, 6.0])
+
+	# One KEGG map with two count files: the rows are told apart instead of failing on the repeated organism name
+	def testSameOrganismTwice(self):
+		first = self.writeCounts("first.txt", [("A00_000001", 1, 2), ("A00_000002", 3, 4)])
+		second = self.writeCounts("second.txt", [("A00_000002", 5, 6), ("A00_000003", 7, 8)])
+		store, hierarchies = loadCountStore([self.jsonFileList[0], self.jsonFileList[0]], [first, second], useCache=False)
+		self.assertEqual(store.organisms, ["a00", "a00#2"])
+		self.assertEqual(store.lookup("a00#2", "A00_000002").tolist(), [5.0, 6.0])
+		self.assertEqual(sorted(store.report(hierarchies)),
+						[('collision', 'a00', 'A00_000002', 'a00#2'), ('collision', 'a00#2', 'A00_000002', 'a00')])
+		fileList = os.path.join(self.directory, "twice.txt")
+		with open(fileList, "w") as f:
+			f.write(self.jsonFileList[0]+"\t"+first+"\n"+self.jsonFileList[0]+"\t"+second+"\n")
+		report = os.path.join(self.directory, "report.tsv")
+		cli.networkGraphingMain(["-d", fileList, "--noCache", "--countReport", report, "-e", os.path.join(self.directory, "out.tsv")])
+		with open(report) as f:
+			self.assertEqual(len(f.readlines()), 3)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,45 @@
+# Cache entries of one source file are cleared without touching those of other files in the same directory
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geneExpression import diskCache
+
+class ClearCacheTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.source = os.path.join(self.directory, "foo.txt")
+		self.backup = os.path.join(self.directory, "foo.txt.bak")
+		for path in [self.source, self.backup]:
+			with open(path, "w") as f:
+				f.write("locus\tT1\n")
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def entry(self, source, kind):
+		path = diskCache.cachePath(source, kind, diskCache.fileDigest(source), 1)
+		self.assertTrue(diskCache.writeCache(path, kind))
+		return path
+
+	def testOtherFilesKept(self):
+		cleared = self.entry(self.source, "hierarchy")
+		kept = [self.entry(self.source, "countIndex"), self.entry(self.backup, "hierarchy"), self.entry(self.backup, "countIndex")]
+		self.assertEqual(diskCache.clearCache(self.source, "hierarchy"), 1)
+		self.assertFalse(os.path.exists(cleared))
+		for path in kept:
+			self.assertTrue(os.path.exists(path))
+
+	def testKindIsWhole(self):
+		kept = self.entry(self.source, "result.indexedOrganism")
+		self.assertEqual(diskCache.clearCache(self.source, "result.index"), 0)
+		self.assertTrue(os.path.exists(kept))
+		self.assertEqual(diskCache.clearCache(self.source, "result.indexedOrganism"), 1)
+
+if __name__ == "__main__":
+	unittest.main()
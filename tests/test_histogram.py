@@ -0,0 +1,71 @@
+# histogram.py modes against each other on the synthetic count files (see benchmarks/synthetic.py): vectorized bin counts
+	# against the pandas filter and DataFrame.hist of sequential mode on one timepoint, and streaming cutoffs against exact ones
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+testDir = os.path.dirname(os.path.abspath(__file__))
+repositoryDir = os.path.dirname(testDir)
+sys.path.insert(0, repositoryDir)
+sys.path.insert(0, os.path.join(repositoryDir, "benchmarks"))
+
+from synthetic import writeDataset
+from geneExpression.histogram import readHistogramList, readCountArray, quantileCutoffs, vectorizedHistogram, streamingHistogram
+from geneExpression.rendering import _pyplot
+
+class HistogramTestCase(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		histogramList = writeDataset(self.directory, organisms=1, genes=400, timepoints=5, networks=1, fanOut=1, seed=0)[1]
+		self.path = readHistogramList(histogramList)[0][1]
+		self.values = readCountArray(self.path)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+class VectorizedTest(HistogramTestCase):
+	# With a single timepoint sequential filtering has one step, so both modes keep the same loci and draw the same bins
+		# Each timepoint of the file is taken on its own, with values repeated so the cutoff falls on ties
+	def testSingleTimepoint(self):
+		import pandas as pd
+		plt = _pyplot()
+		for column in range(self.values.shape[1]):
+			values = np.round(self.values[:, [column]], -1)
+			df = pd.DataFrame({'ELP': values[:, 0]})
+			kept = df[df['ELP'] < df['ELP'].quantile(0.9)]
+			axes = kept.hist(bins=100)
+			sequential = [int(patch.get_height()) for patch in axes[0][0].patches]
+			plt.close('all')
+			histogram = vectorizedHistogram(values, cutoff=0.9, bins=100)
+			self.assertAlmostEqual(histogram['cutoffs'][0], df['ELP'].quantile(0.9))
+			self.assertEqual(histogram['kept'], len(kept))
+			self.assertEqual(histogram['counts'][0].tolist(), sequential)
+			np.testing.assert_allclose(histogram['edges'][0], np.histogram_bin_edges(kept['ELP'], bins=100))
+
+class StreamingTest(HistogramTestCase):
+	# A file of no more rows than the sketch holds is sampled whole, so cutoffs, kept rows and bins are those of vectorized mode
+		# whatever the chunk size
+	def testExactCutoffs(self):
+		vectorized = vectorizedHistogram(self.values)
+		for chunkSize in [1, 37, 400, 1000]:
+			histogram = streamingHistogram(self.path, chunkSize=chunkSize, sketchSize=len(self.values))
+			self.assertTrue(histogram['exact'])
+			self.assertEqual(histogram['total'], len(self.values))
+			self.assertEqual(histogram['cutoffs'].tolist(), quantileCutoffs(self.values).tolist())
+			self.assertEqual(histogram['kept'], vectorized['kept'])
+			for i in range(len(vectorized['counts'])):
+				self.assertEqual(histogram['counts'][i].tolist(), vectorized['counts'][i].tolist())
+				np.testing.assert_allclose(histogram['edges'][i], vectorized['edges'][i])
+
+	# One row more than the sketch holds and the cutoffs are sampled
+	def testSampledCutoffs(self):
+		histogram = streamingHistogram(self.path, chunkSize=37, sketchSize=len(self.values) - 1)
+		self.assertFalse(histogram['exact'])
+		self.assertEqual(histogram['total'], len(self.values))
+
+if __name__ == "__main__":
+	unittest.main()
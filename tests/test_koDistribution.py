@@ -0,0 +1,106 @@
+# The organism x KO x timepoint cube of koDistribution against a brute-force walk of synthetic maps (see benchmarks/synthetic.py)
+	# whose second listings of a gene carry another KO, so only the first listing may count
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+testDir = os.path.dirname(os.path.abspath(__file__))
+repositoryDir = os.path.dirname(testDir)
+sys.path.insert(0, repositoryDir)
+sys.path.insert(0, os.path.join(repositoryDir, "benchmarks"))
+
+from synthetic import writeDataset
+from geneExpression.analysis import readFileList, koDistribution
+
+class KODistributionTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		fileList = writeDataset(self.directory, organisms=2, genes=150, timepoints=3, networks=2, fanOut=2, multi=0.6, seed=0)[0]
+		self.jsonFileList, self.countFileList = readFileList(fileList)
+		self.relisted = 0
+		for jsonFile in self.jsonFileList:
+			self.relistKOs(jsonFile)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	# Gene leaves of a map in depth first (map) order
+	def leaves(self, node):
+		for child in node.get('children', []):
+			if 'children' in child:
+				for leaf in self.leaves(child):
+					yield leaf
+			else:
+				yield child
+
+	# Gives every listing of a gene after its first a KO of its own (K9xxxx, which the synthetic genes never use)
+	def relistKOs(self, jsonFile):
+		with open(jsonFile) as f:
+			tree = json.load(f)
+		seen = set()
+		for leaf in self.leaves(tree):
+			locus, rest = leaf['name'].split(" ", 1)
+			if locus in seen and "\tK" in rest:
+				gene, ko = rest.split("\tK", 1)
+				leaf['name'] = locus+" "+gene+"\tK9%04d" % self.relisted+ko[5:]
+				self.relisted += 1
+			seen.add(locus)
+		with open(jsonFile, "w") as f:
+			json.dump(tree, f)
+
+	# organism -> {KO: raw counts per timepoint}, each count file row going to the KO of its locus' first listing
+	def bruteForce(self):
+		cubes = []
+		for jsonFile, countFile in zip(self.jsonFileList, self.countFileList):
+			with open(jsonFile) as f:
+				tree = json.load(f)
+			firstKO = {}
+			for leaf in self.leaves(tree):
+				locus = leaf['name'].split(" ", 1)[0]
+				if locus not in firstKO:
+					parts = leaf['name'].split("\t")
+					firstKO[locus] = parts[1].split(" ", 1)[0] if len(parts) > 1 else None
+			cube = {}
+			with open(countFile) as f:
+				f.readline()
+				for line in f:
+					fields = line.rstrip("\n").split("\t")
+					ko = firstKO.get(fields[0])
+					if ko is not None:
+						cube[ko] = cube.get(ko, 0.0) + np.array([float(field) for field in fields[1:]])
+			cubes.append(cube)
+		return cubes
+
+	def testCube(self):
+		self.assertTrue(self.relisted > 0)
+		distribution = koDistribution(self.jsonFileList, self.countFileList, useCache=False)
+		kos = distribution['labels'][0]
+		self.assertEqual(kos, sorted(kos))
+		self.assertFalse([ko for ko in kos if ko.startswith("K9")])
+		cubes = self.bruteForce()
+		self.assertEqual(set(kos), set(ko for cube in cubes for ko in cube))
+		raw = distribution['cube']['raw']
+		self.assertEqual(raw.shape, (2, len(kos), 3))
+		for organism in range(len(cubes)):
+			expected = np.array([cubes[organism].get(ko, np.zeros(3)) for ko in kos])
+			np.testing.assert_allclose(raw[organism], expected)
+			np.testing.assert_allclose(distribution['expression'][organism]['raw'], expected.sum(axis=0))
+			np.testing.assert_allclose(distribution['totals'][organism]['raw'][0], expected / expected.sum(axis=0))
+		# The synthetic genes of both organisms share KOs by position, so the cube has both organisms on the same KO rows
+		self.assertTrue((raw > 0).all(axis=0).any())
+
+	# Reading the count files in blocks gives the same cube
+	def testChunked(self):
+		plain = koDistribution(self.jsonFileList, self.countFileList, useCache=False)
+		chunked = koDistribution(self.jsonFileList, self.countFileList, useCache=False, chunkSize=17)
+		self.assertEqual(plain['labels'], chunked['labels'])
+		for metric in plain['metrics']:
+			np.testing.assert_allclose(plain['cube'][metric], chunked['cube'][metric])
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,99 @@
+# Length normalized metrics on a hand-computed three gene example
+	# Counts at two timepoints and id_len: X1 [10, 0] 1000, X2 [20, 30] 2000, X3 [0, 60] 500, X1 and X2 in pathway P1, X3 in P2
+		# reads per kilobase: X1 [10, 0], X2 [10, 15], X3 [0, 120], totals [20, 135], read totals [30, 90]
+		# tpm: P1 [20 / 20, 15 / 135] * 1e6, P2 [0, 120 / 135] * 1e6
+		# rpkm: P1 [20 / 30, 15 / 90] * 1e6, P2 [0, 120 / 90] * 1e6
+		# proportional (expressed genes of 3): P1 [2 / 3, 1 / 3], P2 [0, 1 / 3]
+
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geneExpression import cli
+from geneExpression.aggregation import geneBase, finishMetrics
+from geneExpression.pipeline import indexedOrganism, pathwayMatrix
+from geneExpression.export import parquetAvailable
+
+counts = np.array([[10.0, 0.0], [20.0, 30.0], [0.0, 60.0]])
+lengths = np.array([1000, 2000, 500])
+membership = np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]])
+pathwayLabels = ["00010 Glycolysis", "00020 Citrate cycle"]
+
+class FinishMetricsTest(unittest.TestCase):
+	def testHandComputed(self):
+		base = geneBase(counts, lengths)
+		metrics, sums = finishMetrics(membership.T.dot(base), 2, 3, counts.sum(axis=0), base[:, 4:6].sum(axis=0))
+		self.assertEqual(metrics, ['raw', 'proportional', 'tpm', 'rpkm'])
+		np.testing.assert_allclose(sums, [[30.0, 30.0, 2.0 / 3.0, 1.0 / 3.0, 1e6, 15.0 / 135.0 * 1e6, 20.0 / 30.0 * 1e6, 15.0 / 90.0 * 1e6],
+										[0.0, 60.0, 0.0, 1.0 / 3.0, 0.0, 120.0 / 135.0 * 1e6, 0.0, 120.0 / 90.0 * 1e6]])
+
+	def testWithoutLengths(self):
+		metrics, sums = finishMetrics(membership.T.dot(geneBase(counts)), 2, 3, counts.sum(axis=0))
+		self.assertEqual(metrics, ['raw', 'proportional'])
+		self.assertEqual(sums.shape, (2, 4))
+
+# networkGraphing.py --export --metric all on the same genes, values relative to the organism's total of each metric
+class MetricExportTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		tree = {"name": "tst00001", "children": [{"name": "09100 Metabolism", "children": [{"name": "09101 Carbohydrate metabolism",
+				"children": [{"name": "00010 Glycolysis [PATH:tst00010]", "children": [{"name": "X1 gene1"}, {"name": "X2 gene2"}]},
+							{"name": "00020 Citrate cycle [PATH:tst00020]", "children": [{"name": "X3 gene3"}]}]}]}]}
+		jsonFile = os.path.join(self.directory, "tst00001.json")
+		with open(jsonFile, "w") as f:
+			json.dump(tree, f)
+		countFile = os.path.join(self.directory, "tst.counts.txt")
+		with open(countFile, "w") as f:
+			f.write("locus\tEP\tLP\tid_len\n")
+			for i in range(3):
+				f.write("X"+str(i + 1)+"\t"+"\t".join(str(count) for count in counts[i])+"\t"+str(lengths[i])+"\n")
+		self.jsonFile, self.countFile = jsonFile, countFile
+		self.fileList = os.path.join(self.directory, "fileList.txt")
+		with open(self.fileList, "w") as f:
+			f.write(jsonFile+"\t"+countFile+"\n")
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def testAllMetrics(self):
+		out = os.path.join(self.directory, "out.tsv")
+		cli.networkGraphingMain(["-d", self.fileList, "--noCache", "--metric", "all", "-e", out])
+		with open(out) as f:
+			rows = list(csv.DictReader(f, delimiter="\t"))
+		values = dict(((row['metric'], row['label'], row['timepoint']), float(row['value'])) for row in rows if row['level'] == 'Pathway')
+		# Relative to the organism's total tpm and rpkm give the same shares, their scales are checked below
+		expected = {'raw': [[1.0, 30.0 / 90.0], [0.0, 60.0 / 90.0]], 'proportional': [[1.0, 0.5], [0.0, 0.5]],
+					'tpm': [[1.0, 15.0 / 135.0], [0.0, 120.0 / 135.0]], 'rpkm': [[1.0, 15.0 / 135.0], [0.0, 120.0 / 135.0]]}
+		self.assertEqual(sorted(set(key[0] for key in values)), sorted(expected))
+		for metric in expected:
+			for pathway, label in enumerate(pathwayLabels):
+				for timepoint, name in enumerate(["EP", "LP"]):
+					self.assertAlmostEqual(values.get((metric, label, name), 0.0), expected[metric][pathway][timepoint])
+
+	# Without a Parquet engine the run stops before anything is written, the count report included
+	@unittest.skipIf(parquetAvailable(), "a Parquet engine is installed")
+	def testParquetEngine(self):
+		report = os.path.join(self.directory, "report.tsv")
+		for argv in [["-e", os.path.join(self.directory, "out.parquet")], ["-e", os.path.join(self.directory, "out.tsv"), "--format", "parquet"],
+					["--stats", os.path.join(self.directory, "stats.pq"), "-e", os.path.join(self.directory, "out.tsv")]]:
+			self.assertRaises(SystemExit, cli.networkGraphingMain, ["-d", self.fileList, "--noCache", "--countReport", report] + argv)
+			self.assertEqual(sorted(os.listdir(self.directory)), ["fileList.txt", "tst.counts.txt", "tst00001.json"])
+		self.assertRaises(SystemExit, cli.batchMain, ["-d", self.fileList, "-o", os.path.join(self.directory, "batch"), "--format", "parquet"])
+		self.assertFalse(os.path.exists(os.path.join(self.directory, "batch")))
+
+	# Pathway totals of one organism before they are made relative
+	def testOrganismTotals(self):
+		result = indexedOrganism(self.jsonFile, self.countFile, useCache=False)
+		np.testing.assert_allclose(pathwayMatrix(result, pathwayLabels, 'tpm'), [[1e6, 15.0 / 135.0 * 1e6], [0.0, 120.0 / 135.0 * 1e6]])
+		np.testing.assert_allclose(pathwayMatrix(result, pathwayLabels, 'rpkm'), [[20.0 / 30.0 * 1e6, 15.0 / 90.0 * 1e6], [0.0, 120.0 / 90.0 * 1e6]])
+		np.testing.assert_allclose(pathwayMatrix(result, pathwayLabels, 'proportional'), [[2.0 / 3.0, 1.0 / 3.0], [0.0, 1.0 / 3.0]])
+
+if __name__ == "__main__":
+	unittest.main()
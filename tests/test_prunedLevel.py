@@ -0,0 +1,81 @@
+# prunedLevel against a hand-checked level and a plain Python reference: empty rows dropped, labels sorted,
+	# and with top only the K categories of largest share or variance across organisms kept, ties in label order
+
+import os
+import sys
+import unittest
+import numpy as np
+
+testDir = os.path.dirname(os.path.abspath(__file__))
+repositoryDir = os.path.dirname(testDir)
+sys.path.insert(0, repositoryDir)
+
+from geneExpression.aggregation import levelRankings, prunedLevel
+
+# Sorted labels, without all 0.0 rows when dropEmpty, then the top rows by score (the earlier label wins a tie) back in label order
+def referenceLevel(labels, values, top=None, rankBy='share', dropEmpty=True):
+	rows = sorted(zip(labels, [list(row) for row in values]), key=lambda row: row[0])
+	if dropEmpty:
+		rows = [row for row in rows if any(value != 0.0 for value in row[1])]
+	if top is not None:
+		scores = [np.var(row[1]) if rankBy == 'variance' else sum(row[1]) for row in rows]
+		ranked = sorted(range(len(rows)), key=lambda i: (-scores[i], i))[:top]
+		rows = [rows[i] for i in sorted(ranked)]
+	return [row[0] for row in rows], [row[1] for row in rows]
+
+class PrunedLevelTest(unittest.TestCase):
+	labels = ["Pyruvate", "Citrate", "Empty", "Glycolysis", "Nitrogen"]
+	values = [[0.1, 0.5], [0.3, 0.3], [0.0, 0.0], [0.4, 0.0], [0.2, 0.2]]
+
+	def assertLevel(self, pruned, labels, values):
+		self.assertEqual(pruned[0], labels)
+		self.assertEqual(len(pruned[1]), len(labels))
+		np.testing.assert_allclose(pruned[1], np.array(values, dtype=np.float64).reshape(pruned[1].shape))
+
+	def testDropEmpty(self):
+		self.assertLevel(prunedLevel(self.labels, self.values), ["Citrate", "Glycolysis", "Nitrogen", "Pyruvate"],
+						[[0.3, 0.3], [0.4, 0.0], [0.2, 0.2], [0.1, 0.5]])
+		self.assertLevel(prunedLevel(self.labels, self.values, dropEmpty=False), ["Citrate", "Empty", "Glycolysis", "Nitrogen", "Pyruvate"],
+						[[0.3, 0.3], [0.0, 0.0], [0.4, 0.0], [0.2, 0.2], [0.1, 0.5]])
+
+	# Shares 0.6, 0.4, 0.4, 0.6: Citrate and Pyruvate are the top two, Glycolysis wins the tie at 0.4 over Nitrogen
+	def testTopShare(self):
+		self.assertLevel(prunedLevel(self.labels, self.values, top=2), ["Citrate", "Pyruvate"], [[0.3, 0.3], [0.1, 0.5]])
+		self.assertLevel(prunedLevel(self.labels, self.values, top=3), ["Citrate", "Glycolysis", "Pyruvate"],
+						[[0.3, 0.3], [0.4, 0.0], [0.1, 0.5]])
+		self.assertLevel(prunedLevel(self.labels, self.values, top=10), ["Citrate", "Glycolysis", "Nitrogen", "Pyruvate"],
+						[[0.3, 0.3], [0.4, 0.0], [0.2, 0.2], [0.1, 0.5]])
+
+	# Variances 0.0, 0.04, 0.0, 0.04: Glycolysis and Pyruvate differ across organisms, Citrate wins the tie at 0.0
+	def testTopVariance(self):
+		self.assertLevel(prunedLevel(self.labels, self.values, top=2, rankBy='variance'), ["Glycolysis", "Pyruvate"],
+						[[0.4, 0.0], [0.1, 0.5]])
+		self.assertLevel(prunedLevel(self.labels, self.values, top=3, rankBy='variance'), ["Citrate", "Glycolysis", "Pyruvate"],
+						[[0.3, 0.3], [0.4, 0.0], [0.1, 0.5]])
+
+	# Empty rows are dropped before ranking, so they never take a place in the top K
+	def testTopAfterDrop(self):
+		values = [[0.0, 0.0], [0.0, 0.0], [0.0, 0.0], [0.0, 0.0], [0.2, 0.2]]
+		self.assertLevel(prunedLevel(self.labels, values, top=2, rankBy='variance'), ["Nitrogen"], [[0.2, 0.2]])
+		self.assertLevel(prunedLevel(self.labels, values, top=2, rankBy='variance', dropEmpty=False), ["Citrate", "Empty"],
+						[[0.0, 0.0], [0.0, 0.0]])
+		self.assertLevel(prunedLevel(self.labels, [[0.0, 0.0]] * 5, top=2), [], np.zeros((0, 2)))
+
+	def testReference(self):
+		random = np.random.RandomState(0)
+		for trial in range(200):
+			count = random.randint(0, 12)
+			organisms = random.randint(1, 4)
+			labels = ["L%d" % random.randint(20) for i in range(count)]
+			values = np.round(random.random_sample((count, organisms)), 1) * (random.random_sample((count, 1)) > 0.3)
+			for rankBy in levelRankings:
+				for top in [None, 0, 1, 3, count]:
+					for dropEmpty in [True, False]:
+						labelsExpected, valuesExpected = referenceLevel(labels, values, top, rankBy, dropEmpty)
+						self.assertLevel(prunedLevel(labels, values, top, rankBy, dropEmpty), labelsExpected, valuesExpected)
+
+	def testUnknownRanking(self):
+		self.assertRaises(ValueError, prunedLevel, self.labels, self.values, 2, 'mean')
+
+if __name__ == "__main__":
+	unittest.main()
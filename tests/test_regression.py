@@ -0,0 +1,149 @@
+# Regression tests on a small synthetic data set (see benchmarks/synthetic.py)
+	# syntheticBaseline.json holds the chart dictionaries networkGraphing.py and networkGraphing_hardCode.py (with and without -p 1)
+		# produced for that data set before they were moved onto the geneExpression package, one [network, subNetwork, pathway]
+		# list per timepoint. The combined dictionaries of both distributions must still match them
+	# Run with python -m pytest tests (or python -m unittest discover tests) from the repository root
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+testDir = os.path.dirname(os.path.abspath(__file__))
+repositoryDir = os.path.dirname(testDir)
+sys.path.insert(0, repositoryDir)
+sys.path.insert(0, os.path.join(repositoryDir, "benchmarks"))
+
+from synthetic import writeDataset
+from geneExpression.analysis import readFileList, relativeDistribution, traversalDistribution, combinedDicts, cleanDict
+from geneExpression.pipeline import resultEntry, indexedOrganism, traversedOrganism
+
+with open(os.path.join(testDir, "syntheticBaseline.json")) as f:
+	baseline = json.load(f)
+
+class SyntheticTestCase(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.directory = tempfile.mkdtemp()
+		fileList = writeDataset(cls.directory, **baseline['dataset'])[0]
+		cls.jsonFileList, cls.countFileList = readFileList(fileList)
+
+	@classmethod
+	def tearDownClass(cls):
+		shutil.rmtree(cls.directory)
+
+	def assertDictsEqual(self, expected, actual):
+		self.assertEqual(sorted(expected), sorted(actual))
+		for label in expected:
+			np.testing.assert_allclose(actual[label], expected[label], rtol=1e-9, atol=1e-15, err_msg=repr(label))
+
+	def assertSameDistribution(self, expected, actual):
+		self.assertEqual(expected['organisms'], actual['organisms'])
+		self.assertEqual(expected['labels'], actual['labels'])
+		self.assertEqual(sorted(expected['metrics']), sorted(actual['metrics']))
+		for metric in expected['metrics']:
+			for timepoint in range(expected['timepoints']):
+				for expectedDict, actualDict in zip(combinedDicts(expected, timepoint, metric), combinedDicts(actual, timepoint, metric)):
+					self.assertDictsEqual(expectedDict, actualDict)
+
+	# Chart dictionaries of every timepoint and level against the baseline, relative charts are cleaned as networkGraphing.py does
+	def assertMatchesBaseline(self, distribution, name, metric='raw', clean=False):
+		self.assertEqual(distribution['organisms'], baseline['organisms'])
+		self.assertEqual(distribution['timepoints'], len(baseline[name]))
+		for timepoint in range(distribution['timepoints']):
+			levels = combinedDicts(distribution, timepoint, metric)
+			self.assertEqual(len(levels), len(baseline[name][timepoint]))
+			for expected, actual in zip(baseline[name][timepoint], levels):
+				self.assertDictsEqual(expected, cleanDict(actual) if clean else actual)
+
+class CombinedDictTest(SyntheticTestCase):
+	def testRelative(self):
+		distribution = relativeDistribution(self.jsonFileList, self.countFileList, useCache=False)
+		self.assertMatchesBaseline(distribution, 'relative', clean=True)
+
+	def testTraversal(self):
+		distribution = traversalDistribution(self.jsonFileList, self.countFileList, useCache=False)
+		self.assertMatchesBaseline(distribution, 'traversal')
+
+	# networkGraphing_hardCode.py -p 1
+	def testTraversalProportional(self):
+		distribution = traversalDistribution(self.jsonFileList, self.countFileList, useCache=False)
+		self.assertMatchesBaseline(distribution, 'proportional', 'proportional')
+
+class AttributionTest(SyntheticTestCase):
+	def expressionTotals(self, function, attribution):
+		distribution = function(self.jsonFileList, self.countFileList, useCache=False, attribution=attribution)
+		return np.array([expression['raw'] for expression in distribution['expression']])
+
+	# Splitting a gene across its pathways keeps its expression whole, so both views total what first attribution totals
+		# (Brite listings are ignored by both), while full attribution counts multi-listed genes more than once
+	def testFractionalKeepsFirstTotals(self):
+		for function in [relativeDistribution, traversalDistribution]:
+			first = self.expressionTotals(function, 'first')
+			np.testing.assert_allclose(self.expressionTotals(function, 'fractional'), first, rtol=1e-12)
+			self.assertTrue((self.expressionTotals(function, 'full') > first).all())
+
+	def testViewsAgreeOnFirstTotals(self):
+		np.testing.assert_allclose(self.expressionTotals(traversalDistribution, 'first'),
+									self.expressionTotals(relativeDistribution, 'first'), rtol=1e-12)
+
+# Parallel, incremental and streamed runs against a plain run of the same method and attribution, on every metric, timepoint and level
+class EquivalenceTest(SyntheticTestCase):
+	runs = [(relativeDistribution, 'first'), (traversalDistribution, 'full'),
+			(relativeDistribution, 'fractional'), (traversalDistribution, 'fractional')]
+
+	# Every run of runs with the given options against a plain run
+	def assertRunsAgree(self, **options):
+		for function, attribution in self.runs:
+			plain = function(self.jsonFileList, self.countFileList, useCache=False, attribution=attribution)
+			self.assertSameDistribution(plain, function(self.jsonFileList, self.countFileList, attribution=attribution, **options))
+
+	def testParallel(self):
+		self.assertRunsAgree(useCache=False, jobs=2)
+
+	# The first incremental run computes and caches every organism, the second one reads them back
+	def testIncremental(self):
+		for run in range(2):
+			self.assertRunsAgree(incremental=True)
+		# Entries of other attributions are kept side by side
+		organismFunctions = {relativeDistribution: indexedOrganism, traversalDistribution: traversedOrganism}
+		for function, attribution in self.runs:
+			for jsonFile, countFile in zip(self.jsonFileList, self.countFileList):
+				self.assertTrue(os.path.isfile(resultEntry(organismFunctions[function], jsonFile, countFile, attribution)))
+
+	# A chunk size that splits the count files unevenly
+	def testChunked(self):
+		self.assertRunsAgree(useCache=False, chunkSize=7)
+
+# Count files without a header line, as the shipped protein counts, keep their first locus and name timepoints by position
+class HeaderlessTest(SyntheticTestCase):
+	@classmethod
+	def setUpClass(cls):
+		SyntheticTestCase.setUpClass()
+		cls.headerlessFileList = []
+		for countFile in cls.countFileList:
+			with open(countFile) as f:
+				lines = f.readlines()
+			headerless = countFile.replace(".txt", ".headerless.txt")
+			with open(headerless, "w") as f:
+				f.writelines(lines[1:])
+			cls.headerlessFileList.append(headerless)
+
+	def testSameTotals(self):
+		for function in [relativeDistribution, traversalDistribution]:
+			named = function(self.jsonFileList, self.countFileList, useCache=False)
+			for options in [{}, {'chunkSize': 7}]:
+				headerless = function(self.jsonFileList, self.headerlessFileList, useCache=False, **options)
+				self.assertEqual(headerless['timepointLabels'], ["1", "2", "3", "4", "5"])
+				self.assertSameDistribution(named, headerless)
+
+	# Positional names give way to the names of organisms whose count files have a header
+	def testMixedNames(self):
+		distribution = relativeDistribution(self.jsonFileList, [self.countFileList[0], self.headerlessFileList[1]], useCache=False)
+		self.assertEqual(distribution['timepointLabels'], ["T1", "T2", "T3", "T4", "T5"])
+
+if __name__ == "__main__":
+	unittest.main()
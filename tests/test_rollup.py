@@ -0,0 +1,120 @@
+# Rollups against brute-force walks: subtreeTotals and depthTotals over the tree arrays of a synthetic map with categories
+	# nested below some pathways (see benchmarks/synthetic.py), and rollupTotals over every pathway -> subNetwork -> network chain
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+testDir = os.path.dirname(os.path.abspath(__file__))
+repositoryDir = os.path.dirname(testDir)
+sys.path.insert(0, repositoryDir)
+sys.path.insert(0, os.path.join(repositoryDir, "benchmarks"))
+
+from synthetic import writeDataset
+from geneExpression.analysis import readFileList, treeDistribution, traversalDistribution
+from geneExpression.keggIndex import loadHierarchy, treeLinks, excludedCategories
+from geneExpression.countFiles import loadCountFile
+from geneExpression.aggregation import subtreeTotals, depthTotals, rollupTotals
+
+class SubtreeTotalsTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		fileList = writeDataset(self.directory, organisms=1, genes=120, timepoints=3, networks=3, fanOut=2, seed=0)[0]
+		self.jsonFileList, self.countFileList = readFileList(fileList)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	# Moves half the genes of every other pathway into a nested group, and the genes of one group deeper still
+	def nestCategories(self):
+		with open(self.jsonFileList[0]) as f:
+			tree = json.load(f)
+		pathways = [pathway for network in tree['children'][:-1] for subNetwork in network['children'] for pathway in subNetwork['children']]
+		for i in range(0, len(pathways), 2):
+			genes = pathways[i].get('children', [])
+			if len(genes) > 1:
+				half = len(genes) // 2
+				group = {"name": "%05d Group %d" % (90000 + i, i), "children": genes[:half]}
+				if i == 0:
+					group["children"] = [{"name": "%05d Subgroup" % 99999, "children": genes[:half]}]
+				pathways[i]['children'] = [group] + genes[half:]
+		with open(self.jsonFileList[0], "w") as f:
+			json.dump(tree, f)
+
+	def testBruteForce(self):
+		self.nestCategories()
+		hierarchy = loadHierarchy(self.jsonFileList[0], useCache=False)
+		matrix = loadCountFile(self.countFileList[0], useCache=False)
+		self.assertTrue(hierarchy['treeDepth'][hierarchy['treeLabel'] >= 0].max() >= 5)
+		values = np.asarray(matrix['counts'])
+		geneRows, treeNodes = treeLinks(hierarchy, matrix['loci'], excludedCategories)
+		totals = subtreeTotals(values, geneRows, treeNodes, hierarchy['treeEnd'])
+		# Every listing of a locus adds its counts to the node and each of its ancestors
+		rows = dict((matrix['loci'][i], i) for i in range(len(matrix['loci'])))
+		expected = np.zeros(totals.shape)
+		for node in range(len(hierarchy['treeLocus'])):
+			locus = hierarchy['treeLocus'][node]
+			if locus < 0 or hierarchy['loci'][locus] not in rows:
+				continue
+			network = hierarchy['treeName'][hierarchy['treeNetwork'][node]]
+			if network >= 0 and hierarchy['names'][network] in excludedCategories:
+				continue
+			ancestor = node
+			while ancestor >= 0:
+				expected[ancestor] += values[rows[hierarchy['loci'][locus]]]
+				ancestor = hierarchy['treeParent'][ancestor]
+		np.testing.assert_allclose(totals, expected)
+		for depth in range(1, int(hierarchy['treeDepth'].max()) + 1):
+			labelIDs, depthSums = depthTotals(totals, hierarchy['treeDepth'], hierarchy['treeLabel'], depth)
+			bruteForce = {}
+			for node in np.flatnonzero((hierarchy['treeDepth'] == depth) & (hierarchy['treeLabel'] >= 0)):
+				label = hierarchy['treeLabel'][node]
+				bruteForce[label] = bruteForce.get(label, 0.0) + expected[node]
+			self.assertEqual(sorted(labelIDs.tolist()), sorted(bruteForce))
+			for labelID, sums in zip(labelIDs, depthSums):
+				np.testing.assert_allclose(sums, bruteForce[labelID])
+
+	# Depths 1 to 3 of the tree rollup are the traversal's networks, subNetworks and pathways, as shares of the networks' total
+	def testTraversalLevels(self):
+		tree = treeDistribution(self.jsonFileList, self.countFileList, useCache=False)
+		traversal = traversalDistribution(self.jsonFileList, self.countFileList, useCache=False)
+		for level in range(3):
+			# The tree keeps the excluded Brite category as an empty row
+			treeTotals = dict((label, sums) for label, sums in zip(tree['labels'][level], tree['totals'][0]['raw'][level].tolist()) if any(sums))
+			# Both relative to the total over the networks
+			traversalShares = traversal['totals'][0]['raw'][level] / traversal['expression'][0]['raw']
+			traversalTotals = dict(zip(traversal['labels'][level], traversalShares.tolist()))
+			# Only the Brite network is dropped from the traversal, as networkGraphing_hardCode.py did, its subNetworks and pathways
+				# stay listed there
+			self.assertTrue(set(treeTotals) <= set(traversalTotals))
+			self.assertTrue(len(set(traversalTotals) - set(treeTotals)) <= 1)
+			for label in treeTotals:
+				np.testing.assert_allclose(treeTotals[label], traversalTotals[label])
+
+class RollupTotalsTest(unittest.TestCase):
+	# Random rollups where pathways and subNetworks may sit under several parents, every chain adds the pathway once
+	def testBruteForce(self):
+		random = np.random.RandomState(0)
+		for trial in range(5):
+			pathwayToSubNetwork = (random.random_sample((9, 4)) < 0.35).astype(np.float64)
+			subNetworkToNetwork = (random.random_sample((4, 3)) < 0.5).astype(np.float64)
+			pathwaySums = random.random_sample((9, 2))
+			networks = np.zeros((3, 2))
+			subNetworks = np.zeros((4, 2))
+			pathways = np.zeros((9, 2))
+			for p in range(9):
+				for s in range(4):
+					for n in range(3):
+						if pathwayToSubNetwork[p, s] and subNetworkToNetwork[s, n]:
+							networks[n] += pathwaySums[p]
+							subNetworks[s] += pathwaySums[p]
+							pathways[p] += pathwaySums[p]
+			for actual, expected in zip(rollupTotals(pathwaySums, pathwayToSubNetwork, subNetworkToNetwork), [networks, subNetworks, pathways]):
+				np.testing.assert_allclose(actual, expected)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,42 @@
+# The query service only ever replaces a stale Unix socket at its --socket path
+
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geneExpression import cli
+from geneExpression.service import makeServer
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets are not available")
+class SocketPathTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.path = os.path.join(self.directory, "service.sock")
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def testOtherFileKept(self):
+		with open(self.path, "w") as f:
+			f.write("ebr00001.json\tebr.counts.txt\n")
+		self.assertRaises(ValueError, makeServer, None, socketPath=self.path)
+		# The command line stops before loading the fileList
+		self.assertRaises(SystemExit, cli.serviceMain, ["-d", os.path.join(self.directory, "missing.txt"), "--socket", self.path])
+		with open(self.path) as f:
+			self.assertEqual(f.read(), "ebr00001.json\tebr.counts.txt\n")
+
+	def testStaleSocketReplaced(self):
+		stale = socket.socket(socket.AF_UNIX)
+		stale.bind(self.path)
+		stale.close()
+		server = makeServer(None, socketPath=self.path)
+		server.server_close()
+		self.assertTrue(os.path.exists(self.path))
+
+if __name__ == "__main__":
+	unittest.main()
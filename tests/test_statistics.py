@@ -0,0 +1,98 @@
+# Permutation p-values, Benjamini-Hochberg q-values and bootstrap intervals of significanceTests on small synthetic data sets
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+testDir = os.path.dirname(os.path.abspath(__file__))
+repositoryDir = os.path.dirname(testDir)
+sys.path.insert(0, repositoryDir)
+sys.path.insert(0, os.path.join(repositoryDir, "benchmarks"))
+
+from synthetic import writeDataset
+from geneExpression.analysis import readFileList, relativeDistribution
+from geneExpression.statistics import statisticsColumns, significanceTests, adjustedPValues
+
+class AdjustedPValueTest(unittest.TestCase):
+	# Sorted p-values 0.005, 0.01, 0.03, 0.04, 0.5 give p * 5 / rank = 0.025, 0.025, 0.05, 0.05, 0.5, already monotone
+	def testHandChecked(self):
+		np.testing.assert_allclose(adjustedPValues([0.01, 0.04, 0.03, 0.005, 0.5]), [0.025, 0.05, 0.05, 0.025, 0.5])
+		# 0.9 * 2 / 1 = 1.8 is lowered to the q-value of the larger p-value, and q-values never exceed 1
+		np.testing.assert_allclose(adjustedPValues([0.9, 0.95]), [0.95, 0.95])
+		np.testing.assert_allclose(adjustedPValues([0.6, 0.7, 0.8]), [0.8, 0.8, 0.8])
+		self.assertEqual(len(adjustedPValues([])), 0)
+
+	# Against the definition, q_i = min over p_j >= p_i of p_j * n / rank_j, capped at 1, ties included
+	def testReference(self):
+		pValues = np.random.RandomState(0).random_sample(40) ** 2
+		pValues[5] = pValues[6]
+		ranks = np.argsort(np.argsort(pValues, kind='stable'), kind='stable') + 1
+		reference = [min(1.0, min(pValues[j] * len(pValues) / ranks[j] for j in range(len(pValues)) if pValues[j] >= pValues[i]))
+						for i in range(len(pValues))]
+		np.testing.assert_allclose(adjustedPValues(pValues), reference)
+
+class SignificanceTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		fileList = writeDataset(self.directory, organisms=2, genes=60, timepoints=2, networks=2, fanOut=2, seed=0)[0]
+		self.jsonFileList, self.countFileList = readFileList(fileList)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def significanceRows(self, jsonFileList, countFileList, **options):
+		distribution = relativeDistribution(jsonFileList, countFileList, useCache=False)
+		rows = significanceTests(distribution, jsonFileList, countFileList, permutations=200, bootstraps=200, useCache=False, **options)
+		self.assertTrue(rows)
+		return [dict(zip(statisticsColumns, row)) for row in rows]
+
+	# An organism against itself: no difference, every permutation is as extreme, p = 1 and the intervals hold 0
+	def testIdenticalOrganisms(self):
+		jsonFileList = [self.jsonFileList[0], self.jsonFileList[0]]
+		countFileList = [self.countFileList[0], self.countFileList[0]]
+		for row in self.significanceRows(jsonFileList, countFileList):
+			self.assertEqual(row['difference'], 0.0)
+			self.assertAlmostEqual(row['pValue'], 1.0)
+			self.assertAlmostEqual(row['qValue'], 1.0)
+			self.assertTrue(row['ciLower'] <= 0.0 <= row['ciUpper'])
+
+	# The same seed gives the same table whatever the number of jobs, as batches are seeded by their index
+	def testJobsIndependent(self):
+		single = self.significanceRows(self.jsonFileList, self.countFileList, seed=3, jobs=1)
+		self.assertEqual(single, self.significanceRows(self.jsonFileList, self.countFileList, seed=3, jobs=2))
+		self.assertNotEqual(single, self.significanceRows(self.jsonFileList, self.countFileList, seed=4, jobs=1))
+
+	# An organism against a copy of its counts with the genes of one pathway expressed 20 times more: that pathway differs
+		# beyond nearly every permutation and its bootstrap interval leaves out 0
+	def testPlantedDifference(self):
+		with open(self.countFileList[0]) as f:
+			lines = f.readlines()
+		with open(self.jsonFileList[0]) as f:
+			pathway = json.load(f)['children'][0]['children'][0]['children'][0]
+		loci = set(child['name'].split(" ")[0] for child in pathway['children'])
+		boosted = os.path.join(self.directory, "boosted.txt")
+		with open(boosted, "w") as f:
+			f.write(lines[0])
+			for line in lines[1:]:
+				fields = line.rstrip("\n").split("\t")
+				if fields[0] in loci:
+					fields[1:] = [repr(float(field) * 20.0) for field in fields[1:]]
+				f.write("\t".join(fields)+"\n")
+		rows = self.significanceRows([self.jsonFileList[0], self.jsonFileList[0]], [self.countFileList[0], boosted])
+		label = pathway['name'].rsplit(" [", 1)[0]
+		planted = [row for row in rows if row['level'] == 'Pathway' and row['label'] == label]
+		self.assertEqual(len(planted), 2)
+		for row in rows:
+			self.assertTrue(0.0 < row['pValue'] <= row['qValue'] <= 1.0)
+			self.assertTrue(row['ciLower'] <= row['ciUpper'])
+		for row in planted:
+			self.assertTrue(row['difference'] < 0.0)
+			self.assertTrue(row['pValue'] < 0.05)
+			self.assertTrue(row['ciUpper'] < 0.0)
+
+if __name__ == "__main__":
+	unittest.main()